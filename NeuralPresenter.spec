@@ -3,7 +3,7 @@
 
 a = Analysis(
     ['main.py'],
-    pathex=[],
+    pathex=['agent'],
     binaries=[],
     datas=[('index.html', '.'), ('style.css', '.'), ('app.js', '.'), ('.env', '.')],
     hiddenimports=['engineio.async_drivers.threading'],
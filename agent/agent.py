@@ -203,6 +203,8 @@ import os
 import json
 import sys
 import time
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -210,6 +212,7 @@ from dotenv import load_dotenv
 CURRENT_DIR = Path(__file__).parent.absolute()
 PARENT_DIR = CURRENT_DIR.parent
 sys.path.append(str(PARENT_DIR))
+sys.path.append(str(CURRENT_DIR))
 
 if (CURRENT_DIR / ".env").exists():
     load_dotenv(CURRENT_DIR / ".env")
@@ -222,42 +225,149 @@ from livekit.agents import (
     AgentSession,
     AutoSubscribe,
     JobContext,
-    WorkerOptions,
+    JobProcess,
     cli,
     function_tool,
 )
 from livekit.agents.voice import VoiceActivityVideoSampler, room_io
 from livekit.plugins import anam, google
 
+import deckstore
+from search import SlideIndex
+from capacity import worker_options
+from telemetry import SessionTrace, SLIDE_CHANGES
+from prompting import build_source_material, slide_detail, PROMPT_TOKEN_BUDGET
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("ppt-agent")
 
-last_slide_time = 0
+# Minimum gap between two slide changes in one session
+SLIDE_DEBOUNCE_SECONDS = float(os.environ.get("SLIDE_DEBOUNCE_SECONDS", 2))
+# How long to wait for the viewer to confirm a slide, and how often to resend
+SLIDE_ACK_TIMEOUT = float(os.environ.get("SLIDE_ACK_TIMEOUT", 1.0))
+SLIDE_CHANGE_RETRIES = int(os.environ.get("SLIDE_CHANGE_RETRIES", 2))
+# How long update_slide waits for a slide that is still converting
+SLIDE_READY_TIMEOUT = float(os.environ.get("SLIDE_READY_TIMEOUT", 10))
+# How many upcoming slides the browser is told to download in advance
+SLIDE_PREFETCH_AHEAD = int(os.environ.get("SLIDE_PREFETCH_AHEAD", 2))
+# Compiled deck contexts kept per job process, and how many to build in prewarm
+DECK_CONTEXT_CACHE_SIZE = int(os.environ.get("DECK_CONTEXT_CACHE_SIZE", 32))
+PREWARM_DECKS = int(os.environ.get("PREWARM_DECKS", 8))
+# Slides returned per search_slides call
+SEARCH_RESULTS = int(os.environ.get("SEARCH_RESULTS", 3))
+# A pre-created room whose viewer never shows up is left after this long
+VIEWER_JOIN_TIMEOUT = float(os.environ.get("VIEWER_JOIN_TIMEOUT", 900))
 
 # --- 2. LOAD DATA ---
-def get_presentation_data():
-    json_path = PARENT_DIR / "presentation.json"
+def get_deck_id(participant):
+    """The server stores the uploaded deck id in the user's token metadata."""
+    try:
+        deck_id = json.loads(participant.metadata or "{}").get("deck_id")
+    except (ValueError, AttributeError):
+        return None
+    return deck_id if deckstore.is_deck_id(deck_id) else None
+
+def dispatch_metadata(job):
+    """{"deck_id": ...} when the server dispatched us into a pre-created room, else None."""
+    try:
+        metadata = json.loads(job.metadata or "null")
+    except (ValueError, AttributeError):
+        return None
+    return metadata if isinstance(metadata, dict) else None
+
+async def wait_for_viewer(ctx, timeout=VIEWER_JOIN_TIMEOUT):
+    """(participant, perf_counter at join) for the first viewer of a pre-created
+    room, or (None, None) if it closes or nobody comes."""
+    closed = asyncio.Event()
+    ctx.room.on("disconnected", lambda reason: closed.set())
+    joined = asyncio.ensure_future(ctx.wait_for_participant())
+    gone = asyncio.ensure_future(closed.wait())
+    await asyncio.wait([joined, gone], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    gone.cancel()
+    if not joined.done():
+        joined.cancel()
+        return None, None
+    return joined.result(), time.perf_counter()
+
+async def read_manifest(deck_id):
+    """The deck's manifest, read on an executor thread; {} if there is none."""
+    if not deck_id:
+        return {}
+    manifest = await asyncio.get_running_loop().run_in_executor(None, deckstore.load_manifest, deck_id)
+    return manifest or {}
+
+def slide_image_url(deck_id, slide_number, manifest):
+    # Content-hashed once rendered, so the browser can cache it for good
+    if deck_id:
+        return deckstore.published_slide_url(deck_id, slide_number, manifest)
+    return f"/slides/Slide{slide_number}.jpg"
+
+async def wait_for_slide(deck_id, slide_number, timeout=SLIDE_READY_TIMEOUT):
+    """Decks are published slide by slide; give a slide a moment to render.
+
+    Returns (ready, manifest), the manifest as last read, so callers build
+    URLs and prefetch hints from it instead of reading it again.
+    """
+    manifest = await read_manifest(deck_id)
+    if not deck_id:
+        return True, manifest
+    deadline = time.monotonic() + timeout
+    while not deckstore.slide_ready(deck_id, slide_number, manifest):
+        if time.monotonic() >= deadline:
+            return False, manifest
+        await asyncio.sleep(0.5)
+        manifest = await read_manifest(deck_id)
+    return True, manifest
+
+def prefetch_targets(deck_id, slide_number, manifest, ahead=SLIDE_PREFETCH_AHEAD):
+    """Upcoming slides worth warming in the browser (rendered ones only)."""
+    # slide_count is None until text extraction has counted the slides
+    slide_count = manifest.get("slide_count") or 0
+    if not slide_count:
+        return []
+    last = min(slide_number + ahead, slide_count)
+    complete = manifest.get("status") == "ready"
+    ready = set(manifest.get("ready", []))
+    versions = manifest.get("versions", {})
+    return [
+        {"slide_number": n, "image_url": deckstore.slide_url(deck_id, n, versions.get(str(n)))}
+        for n in range(slide_number + 1, last + 1)
+        if complete or n in ready
+    ]
+
+def get_presentation_data(deck_id=None):
+    # Fall back to the legacy single presentation.json when no deck is bound
+    if deck_id:
+        json_path = Path(deckstore.presentation_path(deck_id))
+    else:
+        json_path = PARENT_DIR / "presentation.json"
     if json_path.exists():
         try:
             with open(json_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                context_str = json.dumps(data, indent=2, ensure_ascii=False)
-                return context_str, len(data)
+                return json.load(f)
         except Exception as e:
             logger.error(f"Error reading JSON: {e}")
-    return None, 0
+    return []
 
 # --- 3. BUILD PROMPT ---
-def build_instructions():
-    context_str, slide_count = get_presentation_data()
+def build_instructions(slides):
+    slide_count = len(slides)
     
-    if context_str:
+    if slides:
         intro = f"Namaste! I have loaded {slide_count} slides. I am ready. Shall I start?"
-        source_material = f"### PRESENTATION CONTENT:\n{context_str}"
+        material, complete = build_source_material(slides)
+        if complete:
+            source_material = f"### PRESENTATION CONTENT:\n{material}"
+        else:
+            # Too big for the budget: outline now, full slides via tools
+            source_material = (
+                f"### PRESENTATION OUTLINE:\n{material}\n\n"
+                "Only titles are listed above. `update_slide` returns the full content of the "
+                "slide it shows; call `get_slide_content(slide_number)` for any other slide."
+            )
     else:
         intro = "Namaste! Please upload a presentation."
         source_material = "No presentation loaded."
-        slide_count = 0
 
     instructions = f"""
     You are **Dia**, a professional Indian Presentation Assistant.
@@ -277,15 +387,162 @@ def build_instructions():
             - Say exactly: **"That concludes the presentation. Do you have any questions?"**
             - **STOP TALKING.** Wait for questions.
 
+    ### QUESTIONS:
+    - Before answering a question, call `search_slides(query)` and base the answer on the slides it returns.
+    - If nothing relevant is found, say the presentation does not cover it.
+
     ### RULES:
     - Never change slides without confirmation.
     - Keep it short.
     """
     return instructions, intro
 
+def load_search_index(deck_id, slides):
+    """The index saved at upload; built in memory for legacy or older decks."""
+    if deck_id:
+        try:
+            return SlideIndex.load(deckstore.search_index_path(deck_id))
+        except (OSError, ValueError, KeyError):
+            pass
+    return SlideIndex.build(slides)
+
+# --- 3b. COMPILED CONTEXT CACHE ---
+class DeckContext:
+    """Everything a session needs from a deck, built once per deck version."""
+
+    def __init__(self, deck_id, slides):
+        self.slides = slides
+        self.slides_by_number = {slide["slide_number"]: slide for slide in slides}
+        self.instructions, self.greeting = build_instructions(slides)
+        self.index = load_search_index(deck_id, slides)
+
+_deck_contexts = OrderedDict()
+_deck_contexts_lock = threading.Lock()
+
+def _presentation_signature(deck_id):
+    path = deckstore.presentation_path(deck_id) if deck_id else PARENT_DIR / "presentation.json"
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def get_deck_context(deck_id=None):
+    """Compiled instructions/greeting for a deck, rebuilt only when its file changes.
+
+    A re-upload of the same deck rewrites presentation.json, which changes the
+    signature; a different deck has a different id. Each job runs in its own
+    process, so a hit only happens for decks prewarm compiled in that process,
+    i.e. decks that existed before it was spawned. Anything newer (a fresh
+    upload) misses and reads presentation.json and search.npz, which is why
+    the entrypoint calls this on an executor thread, never on the event loop.
+    """
+    signature = _presentation_signature(deck_id)
+    with _deck_contexts_lock:
+        cached = _deck_contexts.get(deck_id)
+        if cached and cached[0] == signature:
+            _deck_contexts.move_to_end(deck_id)
+            return cached[1]
+
+    context = DeckContext(deck_id, get_presentation_data(deck_id))
+    with _deck_contexts_lock:
+        _deck_contexts[deck_id] = (signature, context)
+        _deck_contexts.move_to_end(deck_id)
+        while len(_deck_contexts) > DECK_CONTEXT_CACHE_SIZE:
+            _deck_contexts.popitem(last=False)
+    return context
+
+def prewarm(proc: JobProcess):
+    """Runs in each job process before it is handed a room."""
+    for deck_id in [None, *deckstore.recent_deck_ids(PREWARM_DECKS)]:
+        try:
+            get_deck_context(deck_id)
+        except Exception as e:
+            logger.warning(f"Could not prewarm deck {deck_id}: {e}")
+
+# --- 3c. PRESENTER STATE ---
+class PresenterState:
+    """Where one session is in its deck. Lives in the entrypoint closure, so
+    concurrent rooms in the same worker never see each other's slide changes."""
+
+    def __init__(self, slide_count, debounce=SLIDE_DEBOUNCE_SECONDS):
+        self.slide_count = slide_count
+        self.debounce = debounce
+        self.current = None
+        self.history = []
+        self.pending = None
+        self.changed_at = 0.0
+        # slide_change sequence numbers and the acks still awaited
+        self.seq = 0
+        self._acks = {}
+
+    def refuse(self, slide_number):
+        """Why update_slide(slide_number) should not run now, or None if it may."""
+        # A deck still converting may not have its slide count yet (0)
+        if slide_number < 1 or (self.slide_count and slide_number > self.slide_count):
+            return f"There is no slide {slide_number}. The deck has {self.slide_count} slides."
+        if slide_number == self.current:
+            return f"Slide {slide_number} is already on screen."
+        if slide_number == self.pending:
+            return f"Already switching to slide {slide_number}."
+        if self.pending is not None:
+            return f"Still switching to slide {self.pending}; wait for it before changing again."
+        if time.monotonic() - self.changed_at < self.debounce:
+            return f"Slide {self.current} was shown just now; stay on it before changing again."
+        return None
+
+    def moved_to(self, slide_number):
+        if self.current is not None:
+            self.history.append(self.current)
+        self.current = slide_number
+        self.changed_at = time.monotonic()
+
+    def next_change(self):
+        """Number the next slide_change; the future resolves when the viewer acks it."""
+        self.seq += 1
+        acked = asyncio.get_running_loop().create_future()
+        self._acks[self.seq] = acked
+        return self.seq, acked
+
+    def acknowledge(self, seq):
+        # The viewer drops older changes once it shows a newer one, so an ack covers them too
+        for waiting_seq, acked in self._acks.items():
+            if waiting_seq <= seq and not acked.done():
+                acked.set_result(True)
+
+    def forget(self, seq):
+        self._acks.pop(seq, None)
+
+
 async def entrypoint(ctx: JobContext):
+    trace = SessionTrace(ctx.room.name)
+    loop = asyncio.get_running_loop()
+    # Explicit dispatch into a pre-created room: the deck is known before anyone
+    # joins, so the avatar and model start now and the viewer finds them ready
+    dispatch = dispatch_metadata(ctx.job)
+    deck_loading = None
+    if dispatch is not None:
+        deck_id = dispatch.get("deck_id")
+        deck_id = deck_id if deckstore.is_deck_id(deck_id) else None
+        # Read and compile the deck while we connect
+        deck_loading = loop.run_in_executor(None, get_deck_context, deck_id)
+
     logger.info(f"🚀 Connecting to room: {ctx.room.name}")
-    await ctx.connect(auto_subscribe=AutoSubscribe.SUBSCRIBE_ALL)
+    with trace.span("connect"):
+        await ctx.connect(auto_subscribe=AutoSubscribe.SUBSCRIBE_ALL)
+
+    participant = joined_at = None
+    if dispatch is None:
+        with trace.span("participant"):
+            participant = await ctx.wait_for_participant()
+        deck_id = get_deck_id(participant)
+        joined_at = time.perf_counter()
+        deck_loading = loop.run_in_executor(None, get_deck_context, deck_id)
+    else:
+        # Watch for the viewer from now on; they may arrive before we are ready
+        viewer = asyncio.ensure_future(wait_for_viewer(ctx))
+    trace.deck_id = deck_id
+    logger.info(f"📑 Deck for {ctx.room.name}: {deck_id or 'legacy presentation.json'}")
 
     try:
         anam_api_key = os.environ.get("ANAM_API_KEY")
@@ -296,35 +553,114 @@ async def entrypoint(ctx: JobContext):
             logger.error("❌ Missing API Keys")
             return
 
-        instructions_text, greeting_text = build_instructions()
+        with trace.span("deck"):
+            deck = await deck_loading
+        slides, slides_by_number = deck.slides, deck.slides_by_number
+        instructions_text, greeting_text = deck.instructions, deck.greeting
+        presenter = PresenterState(len(slides))
+        logger.info(f"🧾 Instructions: ~{len(instructions_text) // 4} tokens (budget {PROMPT_TOKEN_BUDGET})")
+
+        def on_data_received(packet):
+            try:
+                message = json.loads(packet.data)
+            except (ValueError, UnicodeDecodeError):
+                return
+            if isinstance(message, dict) and message.get("type") == "slide_ack":
+                seq = message.get("seq")
+                if isinstance(seq, int):
+                    presenter.acknowledge(seq)
+
+        ctx.room.on("data_received", on_data_received)
+
+        async def send_slide_change(slide_number, manifest):
+            """Publish a numbered slide_change; resend only while it goes unacknowledged."""
+            seq, acked = presenter.next_change()
+            data = json.dumps({
+                "type": "slide_change",
+                "seq": seq,
+                "slide_number": slide_number,
+                "image_url": slide_image_url(deck_id, slide_number, manifest)
+            })
+            with trace.span("slide_publish", slide=slide_number, seq=seq, acked=False) as span:
+                try:
+                    for attempt in range(1 + SLIDE_CHANGE_RETRIES):
+                        span["attempts"] = attempt + 1
+                        try:
+                            await ctx.room.local_participant.publish_data(payload=data, reliable=True)
+                        except Exception as e:
+                            logger.warning(f"Failed to send slide {slide_number} (seq {seq}): {e}")
+                        try:
+                            await asyncio.wait_for(asyncio.shield(acked), SLIDE_ACK_TIMEOUT)
+                            span["acked"] = True
+                            return True
+                        except asyncio.TimeoutError:
+                            logger.info(f"⏱️ No ack for slide {slide_number} (seq {seq}), attempt {attempt + 1}")
+                    return False
+                finally:
+                    presenter.forget(seq)
+
+        async def publish_prefetch(slide_number, manifest):
+            # Let the browser download the next slides while this one is explained
+            targets = prefetch_targets(deck_id, slide_number, manifest)
+            if not targets:
+                return
+            data = json.dumps({"type": "slide_prefetch", "slides": targets})
+            try:
+                await ctx.room.local_participant.publish_data(payload=data, reliable=True)
+            except Exception as e:
+                logger.warning(f"Failed to send prefetch hint: {e}")
 
         # --- 4. TOOL DEFINITION ---
         @function_tool
         async def update_slide(slide_number: int):
             """Change the visible slide."""
-            global last_slide_time
-            current_time = time.time()
-            
-            if current_time - last_slide_time < 2:
-                return f"Slide {slide_number} is already active."
-            
-            last_slide_time = current_time
-            logger.info(f"📸 SWITCHING TO SLIDE {slide_number}")
-            
-            # Send double signal for reliability
-            for _ in range(2):
-                data = json.dumps({
-                    "type": "slide_change", 
-                    "slide_number": slide_number,
-                    "image_url": f"/slides/Slide{slide_number}.jpg"
-                })
+            with trace.span("update_slide", slide=slide_number) as span:
+                refusal = presenter.refuse(slide_number)
+                if refusal:
+                    span["outcome"] = "refused"
+                    SLIDE_CHANGES.labels("refused").inc()
+                    return refusal
+
+                presenter.pending = slide_number
                 try:
-                    await ctx.room.local_participant.publish_data(payload=data, reliable=True)
-                except:
-                    pass
-                await asyncio.sleep(0.1)
+                    ready, manifest = await wait_for_slide(deck_id, slide_number)
+                    if not ready:
+                        span["outcome"] = "not_ready"
+                        SLIDE_CHANGES.labels("not_ready").inc()
+                        return (f"Slide {slide_number} is still being prepared. Talk through its "
+                                f"content briefly, then call update_slide({slide_number}) again.")
+                finally:
+                    presenter.pending = None
+
+                presenter.moved_to(slide_number)
+                logger.info(f"📸 SWITCHING TO SLIDE {slide_number}")
+                span["outcome"] = "shown" if await send_slide_change(slide_number, manifest) else "unconfirmed"
+                SLIDE_CHANGES.labels(span["outcome"]).inc()
+                if span["outcome"] == "unconfirmed":
+                    logger.warning(f"⚠️ Viewer never confirmed slide {slide_number}")
+
+                await publish_prefetch(slide_number, manifest)
+                # Hand the model this slide's text right when it has to talk about it
+                slide = slides_by_number.get(slide_number)
+                if slide:
+                    return f"Screen updated to Slide {slide_number}.\n{slide_detail(slide)}"
+                return f"Screen updated to Slide {slide_number}"
 
-            return f"Screen updated to Slide {slide_number}"
+        @function_tool
+        async def get_slide_content(slide_number: int):
+            """Get the full text (title, bullets, tables, notes) of one slide."""
+            slide = slides_by_number.get(slide_number)
+            if not slide:
+                return f"There is no slide {slide_number}. The deck has {len(slides)} slides."
+            return slide_detail(slide)
+
+        @function_tool
+        async def search_slides(query: str):
+            """Find the slides most relevant to a question and return their text."""
+            hits = deck.index.search(query, limit=SEARCH_RESULTS)
+            if not hits:
+                return "No slide in this presentation covers that."
+            return "\n\n".join(slide_detail(slides_by_number[number]) for number, _ in hits)
 
         # Initialize Model
         llm_model = google.realtime.RealtimeModel(
@@ -350,25 +686,48 @@ async def entrypoint(ctx: JobContext):
             preemptive_generation=False, 
         )
 
+        @session.on("agent_state_changed")
+        def on_agent_state_changed(event):
+            # The greeting is the first thing the avatar says
+            if event.new_state == "speaking":
+                trace.mark("first_audio")
+                if joined_at is not None:
+                    trace.mark_since("greeting", joined_at, prestarted=dispatch is not None)
+
         try:
-            await avatar.start(session, room=ctx.room)
+            with trace.span("avatar_start"):
+                await avatar.start(session, room=ctx.room)
             
-            await session.start(
-                agent=Agent(
-                    instructions=instructions_text,
-                    tools=[update_slide]
-                ),
-                room=ctx.room,
-                room_input_options=room_io.RoomInputOptions(video_enabled=True),
-            )
+            with trace.span("session_start"):
+                await session.start(
+                    agent=Agent(
+                        instructions=instructions_text,
+                        tools=[update_slide, get_slide_content, search_slides]
+                    ),
+                    room=ctx.room,
+                    room_input_options=room_io.RoomInputOptions(video_enabled=True),
+                )
+
+            if participant is None:
+                logger.info(f"⏳ Ready in {ctx.room.name}, waiting for the viewer")
+                with trace.span("participant", prestarted=True):
+                    participant, joined_at = await viewer
+                if participant is None:
+                    logger.info(f"👋 Nobody joined {ctx.room.name}; leaving")
+                    ctx.shutdown(reason="no viewer")
+                    return
 
             session.generate_reply(instructions=f"Say exactly: '{greeting_text}'")
             logger.info("✅ Agent Active")
 
+            # The frontend opens on slide 1; warm what comes after it
+            await publish_prefetch(1, await read_manifest(deck_id))
+
             # Universal Keep-Alive
             shutdown_future = asyncio.Future()
             @ctx.room.on("disconnected")
             def on_disconnected(reason):
+                trace.mark("session", reason=str(reason), slides_shown=len(presenter.history) + bool(presenter.current))
                 if not shutdown_future.done():
                     shutdown_future.set_result(None)
             
@@ -385,4 +744,4 @@ async def entrypoint(ctx: JobContext):
         logger.error(f"❌ Critical Error: {e}", exc_info=True)
 
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint))
\ No newline at end of file
+    cli.run_app(worker_options(entrypoint, prewarm))
\ No newline at end of file
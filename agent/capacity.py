@@ -0,0 +1,135 @@
+"""How many presenter sessions one worker takes, and the load it reports.
+
+Each session holds an avatar stream and a realtime model connection, so a
+node is usually full long before its CPU is. The load reported to dispatch
+is the larger of the session share and the CPU average, scaled so that the
+worker turns itself unavailable exactly at MAX_SESSIONS_PER_WORKER; job
+requests beyond that are rejected outright (dev mode ignores load).
+
+On SIGTERM the worker stops taking jobs and waits up to WORKER_DRAIN_TIMEOUT
+for running sessions to end before exiting.
+
+With AGENT_NAME set the worker only takes explicit dispatches for that name,
+as made by the web server when it pre-creates a room (rooms.py); it must
+then match the server's AGENT_NAME.
+"""
+import os
+import logging
+import threading
+
+from livekit.agents import WorkerOptions
+from livekit.agents.utils.hw import get_cpu_monitor
+
+from telemetry import AGENT_METRICS_PORT, PROMETHEUS_MULTIPROC_DIR
+
+logger = logging.getLogger("ppt-capacity")
+
+MAX_SESSIONS_PER_WORKER = int(os.environ.get("MAX_SESSIONS_PER_WORKER", 4))
+WORKER_LOAD_THRESHOLD = float(os.environ.get("WORKER_LOAD_THRESHOLD", 0.75))
+# A presentation can run long; give it time to finish before the node goes away
+WORKER_DRAIN_TIMEOUT = int(os.environ.get("WORKER_DRAIN_TIMEOUT", 1800))
+# Warm job processes kept ready; never more than the sessions we accept
+WORKER_IDLE_PROCESSES = int(os.environ.get("WORKER_IDLE_PROCESSES", min(MAX_SESSIONS_PER_WORKER, 2)))
+CPU_SAMPLE_SECONDS = float(os.environ.get("CPU_SAMPLE_SECONDS", 0.5))
+CPU_SAMPLES = 5
+# Empty: join every new room automatically
+AGENT_NAME = os.environ.get("AGENT_NAME", "")
+
+
+class SessionLoad:
+    """load_fnc for the worker, and the count of sessions it has taken on.
+
+    A job counts from the moment accept_request reserves it, not from the
+    next load refresh, so requests arriving together cannot all slip under
+    the cap. It stops counting once its process no longer runs it.
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS_PER_WORKER, threshold=WORKER_LOAD_THRESHOLD):
+        self.max_sessions = max_sessions
+        self.threshold = threshold
+        self._pending = set()
+        self._running = set()
+        self._samples = []
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    def _sample_cpu(self):
+        monitor = get_cpu_monitor()
+        while True:
+            usage = monitor.cpu_percent(interval=CPU_SAMPLE_SECONDS)
+            with self._lock:
+                self._samples = (self._samples + [usage])[-CPU_SAMPLES:]
+
+    def cpu(self):
+        if self._sampler is None:
+            self._sampler = threading.Thread(target=self._sample_cpu, daemon=True, name="ppt-cpu-load")
+            self._sampler.start()
+        with self._lock:
+            return sum(self._samples) / len(self._samples) if self._samples else 0.0
+
+    @property
+    def sessions(self):
+        with self._lock:
+            return len(self._pending) + len(self._running)
+
+    def reserve(self, job_id):
+        """Take a session slot for job_id; False when the worker is full."""
+        with self._lock:
+            if len(self._pending) + len(self._running) >= self.max_sessions:
+                return False
+            self._pending.add(job_id)
+            return True
+
+    def launched(self, job_id):
+        with self._lock:
+            self._pending.discard(job_id)
+            self._running.add(job_id)
+
+    def release(self, job_id):
+        with self._lock:
+            self._pending.discard(job_id)
+            self._running.discard(job_id)
+
+    def __call__(self, worker):
+        active = {info.job.id for info in worker.active_jobs}
+        with self._lock:
+            # Finished jobs drop out here; jobs not accepted through us still count
+            self._running = (self._running & active) | (active - self._pending)
+        by_sessions = self.threshold * self.sessions / max(self.max_sessions, 1)
+        return min(1.0, max(by_sessions, self.cpu()))
+
+
+session_load = SessionLoad()
+
+
+async def accept_request(req):
+    """Hard cap on sessions, even where the load threshold is not enforced."""
+    if not session_load.reserve(req.id):
+        logger.warning(f"🚫 Rejecting room {req.room.name}: {session_load.sessions} sessions running")
+        await req.reject()
+        return
+    try:
+        # Returns once the job is assigned and its process launched
+        await req.accept()
+    except BaseException:
+        session_load.release(req.id)
+        raise
+    session_load.launched(req.id)
+
+
+def worker_options(entrypoint_fnc, prewarm_fnc):
+    metrics = {}
+    if AGENT_METRICS_PORT:
+        metrics = {"prometheus_port": AGENT_METRICS_PORT,
+                   "prometheus_multiproc_dir": PROMETHEUS_MULTIPROC_DIR}
+    return WorkerOptions(
+        entrypoint_fnc=entrypoint_fnc,
+        prewarm_fnc=prewarm_fnc,
+        request_fnc=accept_request,
+        load_fnc=session_load,
+        load_threshold=WORKER_LOAD_THRESHOLD,
+        drain_timeout=WORKER_DRAIN_TIMEOUT,
+        num_idle_processes=WORKER_IDLE_PROCESSES,
+        agent_name=AGENT_NAME,
+        **metrics,
+    )
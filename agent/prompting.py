@@ -0,0 +1,78 @@
+"""Token-budgeted presentation context for the realtime model.
+
+The whole deck used to be pasted into the system instructions as indented
+JSON. Now the instructions carry the full slide text only while it fits in
+PROMPT_TOKEN_BUDGET; bigger decks get a one-line-per-slide outline (cut
+short with "…and N more slides" once it would pass the budget too) and the
+model pulls full slides on demand (get_slide_content / update_slide).
+"""
+import os
+
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", 1500))
+# Cap for the slide text returned by a single tool call
+SLIDE_CONTEXT_TOKENS = int(os.environ.get("SLIDE_CONTEXT_TOKENS", 400))
+
+# Rough English average; good enough to budget without a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text, max_tokens):
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars - 1].rstrip() + "…"
+
+
+def slide_title(slide):
+    title = slide.get("title")
+    if title:
+        return title
+    # Legacy decks only have the flattened content string
+    content = slide.get("content", "").removeprefix("Title: ")
+    return " ".join(content.split()[:8])
+
+
+def slide_detail(slide, max_tokens=SLIDE_CONTEXT_TOKENS):
+    """Compact plain-text rendering of one slide."""
+    lines = [f"Slide {slide['slide_number']}: {slide.get('title', '')}".rstrip()]
+    if "bullets" in slide:
+        lines.extend(f"- {bullet}" for bullet in slide["bullets"])
+        for table in slide.get("tables", []):
+            lines.extend("| " + " | ".join(row) + " |" for row in table)
+        if slide.get("notes"):
+            lines.append(f"Notes: {slide['notes']}")
+    elif slide.get("content"):
+        lines.append(slide["content"])
+    return truncate_to_tokens("\n".join(lines), max_tokens)
+
+
+def build_source_material(slides, budget=PROMPT_TOKEN_BUDGET):
+    """Return (text, complete): full slide text if it fits, else an outline."""
+    full = "\n\n".join(slide_detail(slide) for slide in slides)
+    if estimate_tokens(full) <= budget:
+        return full, True
+
+    # Share the budget evenly so late slides aren't cut off entirely, but
+    # never let a long deck push the outline past the budget
+    per_line = max(8, budget // max(len(slides), 1))
+    lines = []
+    used = 0
+    for i, slide in enumerate(slides):
+        line = truncate_to_tokens(f"{slide['slide_number']}. {slide_title(slide)}", per_line)
+        remaining = len(slides) - i - 1
+        tail = _outline_tail(remaining) if remaining else ""
+        # Every line but the last must leave room for the "…and N more" line
+        if used + estimate_tokens(line) + 1 + estimate_tokens(tail) > budget:
+            lines.append(_outline_tail(len(slides) - i))
+            break
+        lines.append(line)
+        used += estimate_tokens(line) + 1
+    return "\n".join(lines), False
+
+
+def _outline_tail(count):
+    return f"…and {count} more slides, use get_slide_content(slide_number) to read them."
@@ -0,0 +1,85 @@
+"""Timing spans for a presenter session.
+
+Every span is written as one JSON log line carrying the room and deck ids
+(logger ppt-telemetry) and observed in a Prometheus histogram by stage.
+Set AGENT_METRICS_PORT to have the worker serve /metrics; with job
+processes, PROMETHEUS_MULTIPROC_DIR collects their samples too.
+
+Stages: connect, avatar_start, session_start, first_audio (since the job
+started), greeting (viewer joined to first audio), update_slide and
+slide_publish, session (total, at disconnect).
+"""
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger("ppt-telemetry")
+
+AGENT_METRICS_PORT = int(os.environ.get("AGENT_METRICS_PORT", 0))
+PROMETHEUS_MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or None
+
+STAGE_SECONDS = Histogram(
+    "ppt_agent_stage_seconds",
+    "Time spent in each stage of a presenter session",
+    ["stage"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 300, 1800),
+)
+SLIDE_CHANGES = Counter(
+    "ppt_agent_slide_changes_total",
+    "update_slide calls by outcome",
+    ["outcome"],
+)
+
+
+class SessionTrace:
+    """Spans for one room; every record carries its room and deck ids."""
+
+    def __init__(self, room, deck_id=None):
+        self.room = room
+        self.deck_id = deck_id
+        self.started = time.perf_counter()
+        self._marked = set()
+
+    def record(self, stage, seconds, **fields):
+        STAGE_SECONDS.labels(stage).observe(seconds)
+        logger.info(json.dumps({
+            "event": "span",
+            "stage": stage,
+            "ms": round(seconds * 1000, 1),
+            "room": self.room,
+            "deck_id": self.deck_id,
+            **fields,
+        }))
+
+    @contextmanager
+    def span(self, stage, **fields):
+        """Time the block; fields may be filled in by the block before it ends."""
+        start = time.perf_counter()
+        error = None
+        try:
+            yield fields
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            if error:
+                fields["error"] = error
+            self.record(stage, time.perf_counter() - start, **fields)
+
+    def mark(self, stage, **fields):
+        """Record time since the job started, once per stage (e.g. first audio)."""
+        if stage in self._marked:
+            return
+        self._marked.add(stage)
+        self.record(stage, time.perf_counter() - self.started, **fields)
+
+    def mark_since(self, stage, since, **fields):
+        """Like mark, but timed from since (a perf_counter value)."""
+        if stage in self._marked:
+            return
+        self._marked.add(stage)
+        self.record(stage, time.perf_counter() - since, **fields)
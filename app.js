@@ -17,7 +17,15 @@ const videoContainer = document.getElementById('video-container');
 // Slide Elements
 let slideImageElement = null;
 let selectedFile = null;
+let deckId = null;
+// Versioned URL of slide 1 once it is published, so the browser may cache it for good
+let firstSlideUrl = null;
 let heartbeatInterval = null;
+// Highest slide_change sequence number shown; older ones are stale
+let lastSlideSeq = 0;
+// Slides announced via slide_prefetch, kept decoded so switching is instant
+const prefetchedSlides = new Map();
+const PREFETCH_CACHE_SIZE = 8;
 
 // --- 1. FILE UPLOAD LOGIC ---
 dropZone.addEventListener('click', () => fileInput.click());
@@ -44,34 +52,26 @@ uploadBtn.addEventListener('click', async () => {
     uploadBtn.innerHTML = `<span>Uploading...</span>`;
     progressContainer.style.display = 'block';
     
-    // Simulate visual progress
-    let progress = 0;
-    const interval = setInterval(() => {
-        progress += 5;
-        if (progress > 90) clearInterval(interval);
-        progressBar.style.width = `${progress}%`;
-    }, 100);
+    try {
+        const upload = await uploadInChunks(selectedFile);
+        deckId = upload.deck_id;
+        firstSlideUrl = null;
 
-    const formData = new FormData();
-    formData.append('file', selectedFile);
+        // Conversion runs server-side; follow its event stream until it settles
+        uploadBtn.innerHTML = `<span>Processing...</span>`;
+        const job = await watchJob(upload, (deck) => {
+            // Slides are published one by one; slide 1 is enough to start
+            if (deck.ready.includes(1)) {
+                enableConnect(`${deck.ready.length}/${deck.slide_count || '?'}`);
+            }
+        });
+        progressBar.style.width = '100%';
 
-    try {
-        const response = await fetch('/api/upload-ppt', { method: 'POST', body: formData });
-        clearInterval(interval);
-        
-        if (response.ok) {
-            const data = await response.json();
-            progressBar.style.width = '100%';
-            
-            setTimeout(() => {
-                document.getElementById('upload-card').classList.add('disabled');
-                connectCard.classList.remove('disabled');
-                connectBtn.disabled = false;
-                document.getElementById('slide-info').style.display = 'block';
-                slideCountSpan.textContent = data.slide_count || '?';
-                uploadBtn.innerHTML = `<span>Upload Complete</span>`;
-            }, 500);
-        } else { throw new Error('Upload failed'); }
+        setTimeout(() => {
+            document.getElementById('upload-card').classList.add('disabled');
+            enableConnect(job.result.slide_count || '?');
+            uploadBtn.innerHTML = `<span>Upload Complete</span>`;
+        }, 500);
     } catch (error) {
         progressBar.style.width = '0%';
         alert("Error: " + error.message);
@@ -80,14 +80,168 @@ uploadBtn.addEventListener('click', async () => {
     }
 });
 
+// Resumable upload: a dropped chunk is retried from the last byte the server has
+const UPLOAD_RETRIES = 3;
+
+async function uploadError(response) {
+    const body = await response.json().catch(() => ({}));
+    return new Error(body.error || 'Upload failed');
+}
+
+async function uploadInChunks(file) {
+    let response = await fetch('/api/uploads', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ filename: file.name, size: file.size }),
+    });
+    if (!response.ok) throw await uploadError(response);
+    const session = await response.json();
+
+    let offset = 0;
+    let failures = 0;
+    while (offset < file.size) {
+        const chunk = file.slice(offset, offset + session.chunk_size);
+        try {
+            response = await fetch(`${session.upload_url}?offset=${offset}`, { method: 'PUT', body: chunk });
+        } catch (e) {
+            response = null;
+        }
+        if (response && response.ok) {
+            offset = (await response.json()).received;
+            failures = 0;
+            uploadBtn.innerHTML = `<span>Uploading... ${Math.round(offset / file.size * 100)}%</span>`;
+            continue;
+        }
+        // Rejected files (wrong type, too big) won't get better by retrying
+        if (response && response.status !== 409 && response.status < 500) throw await uploadError(response);
+        if (++failures > UPLOAD_RETRIES) throw new Error('Upload failed');
+        const status = await fetch(session.upload_url);
+        if (!status.ok) throw await uploadError(status);
+        offset = (await status.json()).received;
+    }
+
+    response = await fetch(`${session.upload_url}/complete`, { method: 'POST' });
+    if (!response.ok) throw await uploadError(response);
+    return response.json();
+}
+
+function enableConnect(slideCount) {
+    connectCard.classList.remove('disabled');
+    connectBtn.disabled = false;
+    document.getElementById('slide-info').style.display = 'block';
+    slideCountSpan.textContent = slideCount;
+}
+
+// Each stage (pdf, rasterize, text) fills an equal share of the bar
+function showStageProgress(stages) {
+    const done = stages.reduce((sum, s) => sum + (s.total ? s.done / s.total : 0), 0);
+    progressBar.style.width = `${Math.round((done / stages.length) * 95)}%`;
+}
+
+// Thumbnails appear under the upload card as the server publishes each slide
+function showThumbnail(slide) {
+    let strip = document.getElementById('thumbnail-strip');
+    if (!strip) {
+        strip = document.createElement('div');
+        strip.id = 'thumbnail-strip';
+        strip.style.cssText = `
+            display: flex;
+            flex-wrap: wrap;
+            gap: 6px;
+            margin-top: 12px;
+            max-height: 160px;
+            overflow-y: auto;
+        `;
+        progressContainer.after(strip);
+    }
+    if (strip.querySelector(`[data-slide="${slide.slide_number}"]`)) return;
+
+    const img = document.createElement('img');
+    img.dataset.slide = slide.slide_number;
+    img.loading = 'lazy';
+    img.alt = `Slide ${slide.slide_number}`;
+    img.src = `${slide.image_url}${slide.image_url.includes('?') ? '&' : '?'}size=thumb`;
+    img.style.cssText = `width: 72px; border-radius: 4px; border: 1px solid #333; order: ${slide.slide_number};`;
+    strip.appendChild(img);
+}
+
+// Server-sent events: progress, slide and status, resumed by the browser after
+// a dropped connection. Falls back to polling whenever the server refuses the
+// stream (503 once its stream slots are taken), on the first try or a reconnect.
+function watchJob(upload, onDeckProgress) {
+    if (!window.EventSource || !upload.events_url) return waitForJob(upload.job_id, onDeckProgress);
+
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(upload.events_url);
+        const stages = { pdf: { done: 0, total: 0 }, rasterize: { done: 0, total: 0 }, text: { done: 0, total: 0 } };
+        const ready = [];
+
+        source.addEventListener('progress', (e) => {
+            const event = JSON.parse(e.data);
+            stages[event.stage] = event;
+            showStageProgress(Object.values(stages));
+        });
+        source.addEventListener('slide', (e) => {
+            const slide = JSON.parse(e.data);
+            showThumbnail(slide);
+            if (slide.slide_number === 1) firstSlideUrl = slide.image_url;
+            ready.push(slide.slide_number);
+            onDeckProgress({ ready, slide_count: stages.text.total });
+        });
+        source.addEventListener('status', (e) => {
+            const event = JSON.parse(e.data);
+            if (event.status === 'done') {
+                source.close();
+                resolve(event);
+            } else if (event.status === 'failed') {
+                source.close();
+                reject(new Error(event.error || 'Processing failed'));
+            }
+        });
+        source.onerror = () => {
+            // Reconnects on its own; CLOSED means the server refused the stream
+            if (source.readyState !== EventSource.CLOSED) return;
+            source.close();
+            waitForJob(upload.job_id, onDeckProgress).then(resolve, reject);
+        };
+    });
+}
+
+async function waitForJob(jobId, onDeckProgress) {
+    // The async server holds the request until the job changes; waitress answers at once
+    let since = 0;
+    while (true) {
+        const response = await fetch(`/api/jobs/${jobId}?wait=20&since=${since}`);
+        if (!response.ok) { throw new Error('Lost track of upload'); }
+        const job = await response.json();
+
+        showStageProgress(Object.values(job.stages));
+        if (job.deck && job.deck.versions && job.deck.versions['1']) {
+            firstSlideUrl = `/slides/${deckId}/Slide1.jpg?v=${job.deck.versions['1']}`;
+        }
+        if (job.deck && onDeckProgress) onDeckProgress(job.deck);
+
+        if (job.status === 'done') return job;
+        if (job.status === 'failed') throw new Error(job.error || 'Processing failed');
+        const changed = job.updated_at !== since;
+        since = job.updated_at;
+        await new Promise((resolve) => setTimeout(resolve, changed ? 250 : 1000));
+    }
+}
+
 // --- 2. CONNECTION LOGIC ---
 connectBtn.addEventListener('click', async () => {
     connectBtn.disabled = true;
     connectBtn.innerHTML = `<span>Connecting...</span>`;
 
     try {
-        const response = await fetch('/api/connection-details');
-        const { serverUrl, participantToken } = await response.json();
+        const query = deckId ? `?deck_id=${encodeURIComponent(deckId)}` : '';
+        const response = await fetch(`/api/connection-details${query}`, {
+            headers: { 'X-Client-Id': clientId() },
+        });
+        const details = await response.json();
+        if (!response.ok) throw new Error(details.error || 'Could not get a session');
+        const { serverUrl, participantToken } = details;
 
         const room = new LivekitClient.Room();
         
@@ -116,15 +270,24 @@ connectBtn.addEventListener('click', async () => {
             try {
                 const data = JSON.parse(strData);
                 if (data.type === "slide_change" && slideImageElement) {
-                    // Force refresh image to avoid caching
-                    slideImageElement.src = data.image_url + "?t=" + new Date().getTime();
-                    console.log("📸 Slide Updated to:", data.slide_number);
+                    // Resends repeat the seq, and a late packet must not undo a newer slide
+                    if (data.seq === undefined || data.seq > lastSlideSeq) {
+                        lastSlideSeq = data.seq || lastSlideSeq;
+                        // URLs carry a content hash, so the browser cache is always safe to use
+                        slideImageElement.src = sizedSlideUrl(data.image_url);
+                        console.log("📸 Slide Updated to:", data.slide_number);
+                    }
+                    if (data.seq !== undefined) ackSlideChange(room, participant, lastSlideSeq);
+                }
+                if (data.type === "slide_prefetch" && slideImageElement) {
+                    (data.slides || []).forEach((slide) => prefetchSlide(slide.image_url));
                 }
             } catch (e) {
                 // Ignore empty pings
             }
         });
 
+        lastSlideSeq = 0;
         await room.connect(serverUrl, participantToken);
         
         console.log("🎙️ Enabling Microphone...");
@@ -143,6 +306,16 @@ connectBtn.addEventListener('click', async () => {
     }
 });
 
+// Stable per tab, so a quick reload can be handed the same room again
+function clientId() {
+    let id = sessionStorage.getItem('clientId');
+    if (!id) {
+        id = crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+        sessionStorage.setItem('clientId', id);
+    }
+    return id;
+}
+
 // --- 3. HELPER: HEARTBEAT ---
 function startHeartbeat(room) {
     if (heartbeatInterval) clearInterval(heartbeatInterval);
@@ -157,7 +330,41 @@ function startHeartbeat(room) {
     }, 2000); 
 }
 
-// --- 4. HELPER: SLIDE VIEWER ---
+// Tell the agent which slide change is on screen so it stops resending
+function ackSlideChange(room, participant, seq) {
+    const ack = new TextEncoder().encode(JSON.stringify({ type: "slide_ack", seq }));
+    const options = { reliable: true };
+    if (participant) options.destinationIdentities = [participant.identity];
+    room.localParticipant.publishData(ack, options).catch(() => {});
+}
+
+// --- 4. HELPER: SLIDE PREFETCH ---
+// Same sized URL as the viewer will request, so the switch hits the cache
+function prefetchSlide(url) {
+    const sizedUrl = sizedSlideUrl(url);
+    if (prefetchedSlides.has(sizedUrl)) return;
+
+    const img = new Image();
+    img.decoding = 'async';
+    img.src = sizedUrl;
+    if (img.decode) img.decode().catch(() => {});
+    prefetchedSlides.set(sizedUrl, img);
+
+    // Oldest entries go first; the HTTP cache still has them
+    while (prefetchedSlides.size > PREFETCH_CACHE_SIZE) {
+        prefetchedSlides.delete(prefetchedSlides.keys().next().value);
+    }
+}
+
+// --- 5. HELPER: SLIDE VIEWER ---
+// Ask the server for the smallest rendition that still fills the slide box
+function sizedSlideUrl(url) {
+    const box = slideImageElement && slideImageElement.parentElement;
+    const cssWidth = (box && box.clientWidth) || window.innerWidth;
+    const width = Math.round(cssWidth * (window.devicePixelRatio || 1));
+    return `${url}${url.includes('?') ? '&' : '?'}w=${width}`;
+}
+
 function initSlideView() {
     if (document.getElementById('slide-viewer')) return;
 
@@ -186,7 +393,7 @@ function initSlideView() {
     
     slideImageElement = document.createElement('img');
     slideImageElement.style.cssText = `max-width: 100%; max-height: 100%; object-fit: contain;`;
-    slideImageElement.src = "/slides/Slide1.jpg"; 
+    slideImageElement.src = sizedSlideUrl(firstSlideUrl || (deckId ? `/slides/${deckId}/Slide1.jpg` : "/slides/Slide1.jpg"));
     slideBox.appendChild(slideImageElement);
 
     // Avatar Box
@@ -0,0 +1,286 @@
+"""ASGI entry point for the web server: `uvicorn asgi:app` or SERVER_MODE=asgi.
+
+`uvicorn asgi:app` imports server at startup (or on the first request). `python server.py`
+with SERVER_MODE=asgi hands its own module to run() instead, so the Flask
+app, JobManager, converters and room provisioner exist once per process.
+
+Connections are handled by the event loop, so thousands of idle or slow
+clients cost no threads. Each request still runs through server.app (same
+routes, same responses), but only while it is computing: the Flask handler
+runs on ASGI_THREADS executor threads, and a response body such as a slide
+image is pulled from it one block at a time (FILE_BLOCK_BYTES, so a slide is
+usually a single block), with the thread released while the block is sent.
+
+GET /api/jobs/<id>?wait=N&since=<updated_at> is a long poll here: the
+request waits on the event loop (no thread, woken by the job itself, see
+Job.wait_until) until the job changes or N seconds pass. Under waitress the same request just answers at once.
+GET /api/jobs/<id>/events (server-sent events) is served here too, for
+as long as the job runs, instead of holding a thread for SSE_HOLD_SECONDS.
+Conversions keep running on the JobManager pool either way.
+
+Request bodies are buffered before Flask runs, so MAX_CONTENT_LENGTH is
+enforced while reading (413), and Flask gets the buffered size as
+CONTENT_LENGTH, chunked uploads included.
+"""
+import os
+import re
+import sys
+import json
+import asyncio
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from werkzeug.wsgi import FileWrapper
+
+from jobs import sse_message
+
+logger = logging.getLogger('ppt-asgi')
+
+ASGI_THREADS = int(os.environ.get("ASGI_THREADS", 32))
+# Longest a job status request may be held open
+JOB_LONG_POLL_MAX = float(os.environ.get("JOB_LONG_POLL_MAX", 25))
+# Block size for file responses; each block is one trip to an executor thread
+FILE_BLOCK_BYTES = int(os.environ.get("ASGI_FILE_BLOCK_BYTES", 1024 * 1024))
+# Comment line sent on a quiet event stream so proxies keep it open
+SSE_KEEPALIVE_SECONDS = 15
+_JOB_EVENTS_PATH = re.compile(r"^/api/jobs/([^/]+)/events$")
+# Request bodies past this size spill from memory to a temp file
+_SPOOL_BYTES = 1024 * 1024
+
+executor = ThreadPoolExecutor(max_workers=ASGI_THREADS, thread_name_prefix="asgi")
+
+# The server module whose app and jobs are served; see bind()
+_server = None
+
+
+def bind(server_module):
+    """Serve server_module's Flask app and JobManager."""
+    global _server
+    _server = server_module
+
+
+def _bound():
+    if _server is None:
+        import server
+        bind(server)
+    return _server
+
+
+def _environ(scope, body, length):
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+        # send_file asks for 8 KB blocks; read whole slides in one go instead
+        "wsgi.file_wrapper": lambda file, buffer_size=0: FileWrapper(file, FILE_BLOCK_BYTES),
+    }
+    for raw_name, raw_value in scope["headers"]:
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name in ("CONTENT_LENGTH", "TRANSFER_ENCODING"):
+            continue
+        else:
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    # The body is already buffered (and de-chunked): tell Flask its real size
+    environ["CONTENT_LENGTH"] = str(length)
+    return environ
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+async def _read_body(scope, receive, limit):
+    """(body, length) with the body spooled to disk past _SPOOL_BYTES, or None
+    if the client went away. Raises _BodyTooLarge once the declared or the
+    received size passes limit (Flask's MAX_CONTENT_LENGTH), before it is stored.
+    """
+    declared = dict(scope["headers"]).get(b"content-length")
+    try:
+        if limit is not None and declared is not None and int(declared) > limit:
+            raise _BodyTooLarge()
+    except ValueError:
+        pass
+    body = tempfile.SpooledTemporaryFile(max_size=_SPOOL_BYTES)
+    length = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            body.close()
+            return None
+        chunk = message.get("body", b"")
+        length += len(chunk)
+        if limit is not None and length > limit:
+            body.close()
+            raise _BodyTooLarge()
+        body.write(chunk)
+        if not message.get("more_body"):
+            break
+    body.seek(0)
+    return body, length
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload).encode()
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        (b"connection", b"close"),
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _long_poll(path, query):
+    if not path.startswith("/api/jobs/"):
+        return
+    params = parse_qs(query)
+    try:
+        wait = min(float(params["wait"][0]), JOB_LONG_POLL_MAX)
+        since = float(params.get("since", ["0"])[0])
+    except (KeyError, ValueError):
+        return
+    job = _bound().job_manager.get(path.rsplit("/", 1)[-1])
+    if job is not None:
+        await job.wait_until(lambda: job.finished or job.updated_at > since, wait)
+
+
+async def _wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _job_events(job, scope, receive, send):
+    """Same stream as server.job_events, driven by the event loop."""
+    headers = dict(scope["headers"])
+    params = parse_qs(scope["query_string"].decode("latin-1"))
+    try:
+        seq = max(0, int(headers.get(b"last-event-id", b"").decode() or params.get("after", ["0"])[0]))
+    except ValueError:
+        seq = 0
+
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+        ]})
+        await send({"type": "http.response.body", "body": f"retry: {_bound().SSE_RETRY_MS}\n\n".encode(), "more_body": True})
+        while not disconnected.done():
+            events = job.events_since(seq)
+            if events:
+                seq = events[-1]["seq"]
+                body = "".join(sse_message(event) for event in events).encode()
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+                continue
+            if job.finished:
+                break
+            changed = asyncio.ensure_future(
+                job.wait_until(lambda: len(job.events) > seq or job.finished, SSE_KEEPALIVE_SECONDS))
+            await asyncio.wait({changed, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if not changed.done():
+                changed.cancel()
+                break
+            if not changed.result():
+                await send({"type": "http.response.body", "body": b": keepalive\n\n", "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+    finally:
+        disconnected.cancel()
+
+
+async def _call_flask(environ, send):
+    loop = asyncio.get_running_loop()
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                              for name, value in headers]
+        return lambda data: None  # write() is not used by Flask
+
+    def first_block():
+        iterable = _bound().app(environ, start_response)
+        iterator = iter(iterable)
+        return iterable, iterator, next(iterator, b"")
+
+    iterable, iterator, block = await loop.run_in_executor(executor, first_block)
+    try:
+        await send({"type": "http.response.start", "status": started["status"], "headers": started["headers"]})
+        while True:
+            following = await loop.run_in_executor(executor, next, iterator, None)
+            await send({"type": "http.response.body", "body": block, "more_body": following is not None})
+            if following is None:
+                break
+            block = following
+    finally:
+        if hasattr(iterable, "close"):
+            await loop.run_in_executor(executor, iterable.close)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            _bound()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        raise RuntimeError(f"Unsupported ASGI scope {scope['type']}")
+
+    try:
+        received = await _read_body(scope, receive, _bound().app.config.get("MAX_CONTENT_LENGTH"))
+    except _BodyTooLarge:
+        await _send_json(send, 413, {"error": "Request body is too large"})
+        return
+    if received is None:
+        return
+    body, length = received
+    events_path = _JOB_EVENTS_PATH.match(scope["path"]) if scope["method"] == "GET" else None
+    job = _bound().job_manager.get(events_path.group(1)) if events_path else None
+    if job is not None:
+        body.close()
+        await _job_events(job, scope, receive, send)
+        return
+    try:
+        query = scope["query_string"].decode("latin-1")
+        if scope["method"] == "GET":
+            await _long_poll(scope["path"], query)
+        await _call_flask(_environ(scope, body, length), send)
+    finally:
+        body.close()
+
+
+def run(server_module, host="0.0.0.0", port=8000):
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("SERVER_MODE=asgi needs uvicorn (pip install uvicorn)")
+    bind(server_module)
+    uvicorn.run(app, host=host, port=port, log_level="warning")
@@ -0,0 +1,185 @@
+"""Conversion benchmark: process_ppt over synthetic decks and render settings.
+
+    python benchmarks/conversion.py --sizes 10,100,500 --variants text,image \\
+        --dpi 150,200 --formats jpeg,jpeg+webp --workers 1,4
+
+Every combination runs in a fresh subprocess (render settings are read at
+import time, and peak RSS must not carry over between runs) and reports:
+
+    wall        process_ppt wall time
+    stages      seconds per stage from ppt_conversion_stage_seconds (text
+                overlaps the others, renditions is summed over slides)
+    rss         peak RSS of the converting Python process (pdftoppm and
+                soffice run as separate processes and are not included)
+    bytes       output size: full-size JPEGs, renditions, everything
+
+--save writes the results as JSON; --baseline compares against such a file
+and exits non-zero when a run got slower or bigger than --tolerance allows.
+Decks are generated once per size/variant under --cache-dir with a fixed
+seed, so results are comparable between machines and commits.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import itertools
+import resource
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+VARIANTS = {
+    "text": {"bullets": 8, "images": 0},
+    "image": {"bullets": 2, "images": 3},
+}
+STAGES = ("office", "rasterize", "renditions", "text", "save")
+
+
+def run_one(config):
+    """Convert one deck in this process; called in the subprocess."""
+    workdir = tempfile.mkdtemp(prefix="ppt-convbench-")
+    os.environ["DECKS_FOLDER"] = os.path.join(workdir, "decks")
+    os.environ["RENDER_DPI"] = str(config["dpi"])
+    os.environ["RENDITION_FORMATS"] = config["formats"].replace("+", ",")
+    os.environ["RASTER_WORKERS"] = str(config["workers"])
+    os.environ["OFFICE_CONVERTER"] = config["office"]
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+
+    from prometheus_client import REGISTRY
+    import deckstore
+    import server
+
+    try:
+        deck_id = deckstore.deck_key(deckstore.hash_file(config["deck"]), server.RENDER_SETTINGS)
+        start = time.perf_counter()
+        slides = server.process_ppt(config["deck"], deck_id)
+        wall = time.perf_counter() - start
+        if not slides:
+            raise RuntimeError("process_ppt failed")
+
+        stages = {
+            stage: round(REGISTRY.get_sample_value(
+                "ppt_conversion_stage_seconds_sum", {"stage": stage}) or 0.0, 3)
+            for stage in STAGES
+        }
+        folder = deckstore.deck_dir(deck_id)
+        sizes = {name: os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder)}
+        full = sum(size for name, size in sizes.items() if name.count(".") == 1 and name.endswith(".jpg"))
+        total = sum(sizes.values())
+        return {
+            **config,
+            "slide_count": len(slides),
+            "wall_s": round(wall, 3),
+            "stages_s": stages,
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "bytes": {"full": full, "renditions": total - full, "total": total},
+        }
+    finally:
+        server.office_pool.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def deck_for(cache_dir, size, variant, seed):
+    sys.path.insert(0, BENCH_DIR)
+    from synthetic import make_deck
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{variant}-{size}-{seed}.pptx")
+    if not os.path.exists(path):
+        print(f"📝 Generating {variant} deck with {size} slides", file=sys.stderr)
+        make_deck(path, size, seed=seed, **VARIANTS[variant])
+    return path
+
+
+def run_key(result):
+    return f"{result['variant']}/{result['size']}/dpi{result['dpi']}/{result['formats']}/w{result['workers']}"
+
+
+def compare(results, baseline, tolerance):
+    """Runs that are slower or bigger than baseline * (1 + tolerance)."""
+    previous = {run_key(r): r for r in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(run_key(result))
+        if not old:
+            continue
+        for metric, new_value, old_value in (
+            ("wall_s", result["wall_s"], old["wall_s"]),
+            ("peak_rss_mb", result["peak_rss_mb"], old["peak_rss_mb"]),
+            ("bytes", result["bytes"]["total"], old["bytes"]["total"]),
+        ):
+            if old_value and new_value > old_value * (1 + tolerance):
+                regressions.append(f"{run_key(result)} {metric}: {old_value} -> {new_value}")
+    return regressions
+
+
+def print_table(results):
+    header = (f"{'run':<34}{'slides':>7}{'wall s':>9}" + "".join(f"{s:>11}" for s in STAGES)
+              + f"{'rss MB':>9}{'out MB':>9}")
+    print(header)
+    for r in results:
+        print(f"{run_key(r):<34}{r['slide_count']:>7}{r['wall_s']:>9}"
+              + "".join(f"{r['stages_s'][s]:>11}" for s in STAGES)
+              + f"{r['peak_rss_mb']:>9}{r['bytes']['total'] / 1e6:>9.1f}")
+
+
+def csv_list(value, cast=str):
+    return [cast(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="10,50,100,250,500", help="slide counts")
+    parser.add_argument("--variants", default="text,image", help=f"any of {','.join(VARIANTS)}")
+    parser.add_argument("--dpi", default="200", help="RENDER_DPI values")
+    parser.add_argument("--formats", default="jpeg+webp", help="RENDITION_FORMATS sets, '+'-joined")
+    parser.add_argument("--workers", default=str(os.cpu_count() or 1), help="RASTER_WORKERS values")
+    parser.add_argument("--office", default="soffice", choices=("soffice", "fake"))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "ppt-bench-decks"))
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed growth before failing")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_one(json.loads(args.run_one))))
+        return
+
+    results = []
+    grid = itertools.product(csv_list(args.variants), csv_list(args.sizes, int), csv_list(args.dpi, int),
+                             csv_list(args.formats), csv_list(args.workers, int))
+    for variant, size, dpi, formats, workers in grid:
+        config = {"variant": variant, "size": size, "dpi": dpi, "formats": formats,
+                  "workers": workers, "office": args.office,
+                  "deck": deck_for(args.cache_dir, size, variant, args.seed)}
+        print(f"⏱️ {run_key(config)}", file=sys.stderr)
+        proc = subprocess.run([sys.executable, __file__, "--run-one", json.dumps(config)],
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr[-2000:], file=sys.stderr)
+            sys.exit(f"❌ {run_key(config)} failed")
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    print_table(results)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"⚠️ regression {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
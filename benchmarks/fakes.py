@@ -0,0 +1,154 @@
+"""Offline stand-ins for LiveKit, Anam and Gemini used by the load test.
+
+install(presenter) swaps them into the agent module, so agent.entrypoint
+runs unchanged: the room records what is published and answers every
+slide_change with a slide_ack like the browser does, the avatar and the
+realtime model only sleep for their configured start-up times, and the
+session hands its tools to the benchmark instead of to a model.
+"""
+import json
+import random
+import asyncio
+from types import SimpleNamespace
+
+
+class Emitter:
+    """The subset of livekit's EventEmitter the agent uses: on(event[, fn]) and emit."""
+
+    def __init__(self):
+        self._handlers = {}
+
+    def on(self, event, callback=None):
+        if callback is None:
+            def register(fn):
+                self._handlers.setdefault(event, []).append(fn)
+                return fn
+            return register
+        self._handlers.setdefault(event, []).append(callback)
+        return callback
+
+    def emit(self, event, *args):
+        for handler in list(self._handlers.get(event, [])):
+            handler(*args)
+
+
+class FakeLocalParticipant:
+    def __init__(self, room):
+        self.room = room
+        self.published = 0
+        self.published_bytes = 0
+
+    async def publish_data(self, payload, reliable=True, **kwargs):
+        self.published += 1
+        self.published_bytes += len(payload)
+        message = json.loads(payload)
+        if message.get("type") == "slide_change":
+            self.room.viewer_receive(message)
+
+
+class FakeRoom(Emitter):
+    """A room with one browser viewer that acks slide changes after ack_delay."""
+
+    def __init__(self, name, ack_delay=0.005, ack_loss=0.0, seed=0):
+        super().__init__()
+        self.name = name
+        self.ack_delay = ack_delay
+        self.ack_loss = ack_loss
+        self.local_participant = FakeLocalParticipant(self)
+        self.session = None
+        self.greeted = asyncio.Event()
+        self.started = asyncio.Event()
+        self._rng = random.Random(seed)
+        self._shown_seq = 0
+
+    def viewer_receive(self, message):
+        # Same rules as app.js: never go back to an older seq, ack the newest shown
+        self._shown_seq = max(self._shown_seq, message["seq"])
+        if self._rng.random() < self.ack_loss:
+            return
+        ack = json.dumps({"type": "slide_ack", "seq": self._shown_seq}).encode()
+        asyncio.get_running_loop().call_later(
+            self.ack_delay, self.emit, "data_received", SimpleNamespace(data=ack, participant=None))
+
+    def disconnect(self):
+        self.emit("disconnected", "CLIENT_INITIATED")
+
+
+class FakeJobContext:
+    """dispatched: the job carries the deck id, as for a pre-created room, and
+    the viewer joins join_delay seconds after the job starts."""
+
+    def __init__(self, room, deck_id=None, dispatched=False, join_delay=0.0):
+        self.room = room
+        self.job = SimpleNamespace(metadata=json.dumps({"deck_id": deck_id}) if dispatched else "")
+        self.participant = SimpleNamespace(
+            identity=f"user-{room.name}",
+            metadata=json.dumps({"deck_id": deck_id}) if deck_id else "",
+        )
+        self.joins_at = asyncio.get_running_loop().time() + join_delay
+
+    async def connect(self, auto_subscribe=None):
+        await asyncio.sleep(0)
+
+    async def wait_for_participant(self, **kwargs):
+        await asyncio.sleep(max(0.0, self.joins_at - asyncio.get_running_loop().time()))
+        return self.participant
+
+    def shutdown(self, reason=""):
+        self.room.disconnect()
+
+
+class FakeRealtimeModel:
+    def __init__(self, **kwargs):
+        self.options = kwargs
+
+
+class FakeAvatarSession:
+    start_delay = 0.0
+
+    def __init__(self, **kwargs):
+        self.options = kwargs
+
+    async def start(self, session, room):
+        await asyncio.sleep(self.start_delay)
+
+
+class FakeAgentSession(Emitter):
+    """Starts like AgentSession and 'speaks' first_audio_delay after a reply is requested."""
+
+    start_delay = 0.0
+    first_audio_delay = 0.0
+
+    def __init__(self, llm=None, **kwargs):
+        super().__init__()
+        self.llm = llm
+        self.tools = {}
+
+    async def start(self, agent, room, **kwargs):
+        await asyncio.sleep(self.start_delay)
+        self.tools = {tool.id: tool for tool in agent.tools}
+        self.room = room
+        room.session = self
+        room.started.set()
+
+    def generate_reply(self, instructions=None):
+        event = SimpleNamespace(old_state="listening", new_state="speaking")
+
+        def speak():
+            self.emit("agent_state_changed", event)
+            self.room.greeted.set()
+
+        asyncio.get_running_loop().call_later(self.first_audio_delay, speak)
+
+    async def call(self, tool, **arguments):
+        return await self.tools[tool](**arguments)
+
+
+def install(presenter, avatar_delay=0.0, model_delay=0.0, first_audio_delay=0.0):
+    """Point the agent module's LiveKit/Anam/Gemini names at the fakes."""
+    FakeAvatarSession.start_delay = avatar_delay
+    FakeAgentSession.start_delay = model_delay
+    FakeAgentSession.first_audio_delay = first_audio_delay
+    presenter.AgentSession = FakeAgentSession
+    presenter.google = SimpleNamespace(realtime=SimpleNamespace(RealtimeModel=FakeRealtimeModel))
+    presenter.anam = SimpleNamespace(AvatarSession=FakeAvatarSession, PersonaConfig=dict)
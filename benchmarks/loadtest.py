@@ -0,0 +1,323 @@
+"""Offline load test for the web server and the presenter agent.
+
+    python benchmarks/loadtest.py --decks 4 --slides 20 --sessions 50
+
+Server phase: uploads synthetic decks through server.app (Flask test client,
+one thread per concurrent client), polls each job to completion, mints
+connection details and fetches every slide, then revalidates them.
+
+Agent phase: runs agent.entrypoint for --sessions rooms at once against the
+fakes in benchmarks/fakes.py and replays a scripted conversation in each
+(walk the deck, look things up, answer questions). --script takes a JSON
+list of steps instead, e.g. [{"tool": "update_slide", "args":
+{"slide_number": 2}}, {"pause": 1.5}]; "{n}" in string args becomes each
+slide number when a step has "each_slide": true.
+
+--dispatch starts each session the way a pre-created room does (deck id in
+the job, viewer joining --join-delay seconds later) instead of waiting for
+the viewer first; "greeting" is the time from the viewer joining to the
+avatar's first words either way.
+
+Reports count, throughput and p50/p99/max latency per operation, plus RSS
+(and with --tracemalloc, Python heap) per live session. Nothing touches the
+network; conversions use the fake office converter unless --office soffice,
+and rasterizing needs poppler's pdftoppm on PATH.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+class Recorder:
+    """Latency samples per operation, safe to share between threads."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.windows = {}
+        self._lock = threading.Lock()
+
+    def add(self, op, seconds):
+        now = time.perf_counter()
+        with self._lock:
+            self.samples[op].append(seconds)
+            first, _ = self.windows.get(op, (now - seconds, now))
+            self.windows[op] = (min(first, now - seconds), now)
+
+    def timed(self, op, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.add(op, time.perf_counter() - start)
+        return result
+
+    async def timed_async(self, op, awaitable):
+        start = time.perf_counter()
+        result = await awaitable
+        self.add(op, time.perf_counter() - start)
+        return result
+
+    def summary(self):
+        report = {}
+        for op, values in sorted(self.samples.items()):
+            values = sorted(values)
+            first, last = self.windows[op]
+            report[op] = {
+                "count": len(values),
+                "per_second": round(len(values) / max(last - first, 1e-9), 1),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2),
+            }
+        return report
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def configure_environment(args, workdir):
+    """Everything the server and agent read at import time; must run first."""
+    os.environ["DECKS_FOLDER"] = os.path.join(workdir, "decks")
+    os.environ["OFFICE_CONVERTER"] = args.office
+    os.environ["SLIDE_DEBOUNCE_SECONDS"] = "0"
+    os.environ["SLIDE_READY_TIMEOUT"] = str(args.slide_ready_timeout)
+    # All clients share one address; don't measure the per-IP rate limit
+    os.environ["RATE_LIMIT_PER_MINUTE"] = "0"
+    # Dummy credentials: tokens are signed locally and never sent anywhere
+    for name, value in {
+        "LIVEKIT_URL": "ws://127.0.0.1:7880",
+        "LIVEKIT_API_KEY": "benchmark",
+        "LIVEKIT_API_SECRET": "benchmark-secret-benchmark-secret",
+        "ANAM_API_KEY": "benchmark",
+        "ANAM_AVATAR_ID": "benchmark",
+        "GEMINI_API_KEY": "benchmark",
+    }.items():
+        os.environ[name] = value
+    # server.py creates uploads/ and slides/ relative to the working directory
+    os.chdir(workdir)
+
+
+# --- SERVER PHASE ---
+def run_client(client, recorder, deck_path):
+    with open(deck_path, "rb") as f:
+        response = recorder.timed("upload", client.post, "/api/upload-ppt",
+                                  data={"file": (f, os.path.basename(deck_path))},
+                                  content_type="multipart/form-data")
+    upload = response.get_json()
+
+    start = time.perf_counter()
+    while True:
+        job = client.get(upload["status_url"]).get_json()
+        if job["status"] in ("done", "failed"):
+            break
+        time.sleep(0.05)
+    recorder.add("conversion", time.perf_counter() - start)
+    if job["status"] != "done":
+        raise RuntimeError(f"Conversion failed for {deck_path}: {job.get('error')}")
+    deck_id = upload["deck_id"]
+
+    recorder.timed("connection_details", client.get, f"/api/connection-details?deck_id={deck_id}")
+
+    with open(os.path.join(os.environ["DECKS_FOLDER"], deck_id, "presentation.json")) as f:
+        slides = json.load(f)
+    etags = {}
+    for slide in slides:
+        response = recorder.timed("slide_fetch", client.get, slide["image_url"],
+                                  headers={"Accept": "image/webp,*/*"})
+        etags[slide["image_url"]] = response.headers.get("ETag")
+        response.close()
+    for url, etag in etags.items():
+        response = recorder.timed("slide_revalidate", client.get, url,
+                                  headers={"Accept": "image/webp,*/*", "If-None-Match": etag})
+        response.close()
+    return deck_id
+
+
+def server_phase(args, server, deck_paths, recorder):
+    client_count = min(args.concurrency, len(deck_paths))
+    with ThreadPoolExecutor(max_workers=client_count) as executor:
+        futures = [executor.submit(run_client, server.app.test_client(), recorder, path)
+                   for path in deck_paths]
+        return [future.result() for future in futures]
+
+
+# --- AGENT PHASE ---
+def default_script(slides, question_every=3):
+    steps = []
+    for slide in slides:
+        n = slide["slide_number"]
+        steps.append({"tool": "update_slide", "args": {"slide_number": n}})
+        if n % question_every == 0:
+            steps.append({"tool": "search_slides", "args": {"query": slide.get("title") or f"slide {n}"}})
+            steps.append({"tool": "get_slide_content", "args": {"slide_number": max(1, n - 1)}})
+    steps.append({"tool": "search_slides", "args": {"query": "what are the risks and the budget"}})
+    return steps
+
+
+def expand_script(steps, slides):
+    expanded = []
+    for step in steps:
+        if not step.get("each_slide"):
+            expanded.append(step)
+            continue
+        for slide in slides:
+            n = slide["slide_number"]
+            args = {key: value.replace("{n}", str(n)) if isinstance(value, str) else value
+                    for key, value in step.get("args", {}).items()}
+            if "slide_number" in args:
+                args["slide_number"] = int(args["slide_number"])
+            expanded.append({"tool": step["tool"], "args": args})
+    return expanded
+
+
+async def replay(room, script, recorder, think):
+    for step in script:
+        if "pause" in step:
+            await asyncio.sleep(step["pause"])
+            continue
+        await recorder.timed_async(step["tool"], room.session.call(step["tool"], **step.get("args", {})))
+        if think:
+            await asyncio.sleep(think)
+
+
+async def agent_phase(args, presenter, fakes, deck_ids, recorder):
+    script_steps = None
+    if args.script:
+        with open(args.script) as f:
+            script_steps = json.load(f)
+
+    rooms, tasks = [], []
+    baseline_rss = rss_bytes()
+    if args.tracemalloc:
+        tracemalloc.start()
+    baseline_heap = tracemalloc.get_traced_memory()[0] if args.tracemalloc else 0
+
+    async def start(i):
+        deck_id = deck_ids[i % len(deck_ids)]
+        room = fakes.FakeRoom(f"bench-room-{i}", ack_delay=args.ack_delay, ack_loss=args.ack_loss, seed=i)
+        ctx = fakes.FakeJobContext(room, deck_id, dispatched=args.dispatch, join_delay=args.join_delay)
+        rooms.append((room, deck_id))
+        started = time.perf_counter()
+        tasks.append(asyncio.create_task(presenter.entrypoint(ctx)))
+        await room.started.wait()
+        recorder.add("session_setup", time.perf_counter() - started)
+        await room.greeted.wait()
+        recorder.add("greeting", asyncio.get_running_loop().time() - ctx.joins_at)
+
+    await asyncio.gather(*(start(i) for i in range(args.sessions)))
+    memory = {"rss_per_session_kb": round((rss_bytes() - baseline_rss) / args.sessions / 1024, 1)}
+    if args.tracemalloc:
+        memory["heap_per_session_kb"] = round(
+            (tracemalloc.get_traced_memory()[0] - baseline_heap) / args.sessions / 1024, 1)
+        tracemalloc.stop()
+
+    async def converse(room, deck_id):
+        slides = presenter.get_deck_context(deck_id).slides
+        script = expand_script(script_steps, slides) if script_steps else default_script(slides)
+        await replay(room, script, recorder, args.think)
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(converse(room, deck_id) for room, deck_id in rooms))
+    wall = time.perf_counter() - wall
+
+    for room, _ in rooms:
+        room.disconnect()
+    await asyncio.gather(*tasks)
+
+    published = sum(room.local_participant.published for room, _ in rooms)
+    memory["data_messages"] = published
+    memory["conversation_wall_s"] = round(wall, 2)
+    return memory
+
+
+def print_report(title, summary):
+    print(f"\n{title}")
+    print(f"{'operation':<22}{'count':>8}{'per s':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for op, row in summary.items():
+        print(f"{op:<22}{row['count']:>8}{row['per_second']:>10}{row['p50_ms']:>10}"
+              f"{row['p99_ms']:>10}{row['max_ms']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--decks", type=int, default=4, help="distinct decks to upload")
+    parser.add_argument("--slides", type=int, default=20, help="slides per deck")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent upload clients")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent agent sessions")
+    parser.add_argument("--script", help="JSON conversation script (default: walk the deck)")
+    parser.add_argument("--think", type=float, default=0.0, help="seconds between script steps")
+    parser.add_argument("--avatar-delay", type=float, default=0.0, help="simulated avatar.start time")
+    parser.add_argument("--model-delay", type=float, default=0.0, help="simulated session.start time")
+    parser.add_argument("--dispatch", action="store_true", help="start sessions before the viewer joins")
+    parser.add_argument("--join-delay", type=float, default=0.0, help="seconds until the viewer joins")
+    parser.add_argument("--ack-delay", type=float, default=0.005, help="simulated viewer ack time")
+    parser.add_argument("--ack-loss", type=float, default=0.0, help="fraction of acks dropped")
+    parser.add_argument("--slide-ready-timeout", type=float, default=10)
+    parser.add_argument("--office", default="fake", choices=("fake", "soffice"))
+    parser.add_argument("--seed", type=int, default=None, help="deck seed (default: fresh each run)")
+    parser.add_argument("--tracemalloc", action="store_true", help="also measure Python heap per session")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--keep", action="store_true", help="keep the work directory (decks, uploads)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ppt-loadtest-")
+    configure_environment(args, workdir)
+
+    import server
+    from agent import agent as presenter
+    import fakes
+    from synthetic import make_deck
+
+    fakes.install(presenter, avatar_delay=args.avatar_delay, model_delay=args.model_delay)
+    seed = args.seed if args.seed is not None else time.time_ns()
+    deck_paths = [make_deck(os.path.join(workdir, f"deck{i}.pptx"), args.slides, seed=seed + i)
+                  for i in range(args.decks)]
+
+    server_recorder = Recorder()
+    deck_ids = server_phase(args, server, deck_paths, server_recorder)
+
+    agent_recorder = Recorder()
+    memory = asyncio.run(agent_phase(args, presenter, fakes, deck_ids, agent_recorder))
+
+    if not args.keep:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "server": server_recorder.summary(),
+        "agent": agent_recorder.summary(),
+        "sessions": {"count": args.sessions, **memory},
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print_report(f"SERVER ({args.decks} decks x {args.slides} slides, {args.concurrency} clients)",
+                 report["server"])
+    print_report(f"AGENT ({args.sessions} concurrent sessions)", report["agent"])
+    print(f"\nsessions: {json.dumps(report['sessions'])}")
+    if args.keep:
+        print(f"workdir: {workdir}")
+
+
+if __name__ == "__main__":
+    main()
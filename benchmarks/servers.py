@@ -0,0 +1,167 @@
+"""Compare SERVER_MODE=waitress against SERVER_MODE=asgi under concurrency.
+
+    python benchmarks/servers.py --concurrency 10,100,1000 --requests 20
+
+Each mode is started as a real server process on a free port (fake office
+converter, throwaway decks folder). One synthetic deck is uploaded, then at
+every concurrency level that many clients, each on its own connection, send
+--requests requests cycling through job status, slide fetch (with Accept:
+image/webp), slide revalidation and connection details. Reports throughput,
+p50/p99 latency and errors per mode and level.
+
+Needs uvicorn for the asgi mode (skipped otherwise) and pdftoppm on PATH.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loadtest import percentile
+from synthetic import make_deck
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start(mode, workdir):
+    port = free_port()
+    env = {
+        **os.environ,
+        "SERVER_MODE": mode,
+        "PORT": str(port),
+        "OFFICE_CONVERTER": "fake",
+        "DECKS_FOLDER": os.path.join(workdir, "decks"),
+        "LIVEKIT_URL": "ws://127.0.0.1:7880",
+        "LIVEKIT_API_KEY": "benchmark",
+        "LIVEKIT_API_SECRET": "benchmark-secret-benchmark-secret",
+        # Every client comes from 127.0.0.1; the per-IP limit would dominate
+        "RATE_LIMIT_PER_MINUTE": "0",
+    }
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "server.py")], cwd=workdir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return proc, f"http://127.0.0.1:{port}"
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{mode} server exited during startup")
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+async def prepare(base, deck_path):
+    async with aiohttp.ClientSession() as session:
+        form = aiohttp.FormData()
+        form.add_field("file", open(deck_path, "rb"), filename="deck.pptx")
+        async with session.post(f"{base}/api/upload-ppt", data=form) as response:
+            upload = await response.json()
+        while True:
+            async with session.get(f"{base}{upload['status_url']}") as response:
+                job = await response.json()
+            if job["status"] in ("done", "failed"):
+                break
+            await asyncio.sleep(0.2)
+        if job["status"] != "done":
+            raise RuntimeError("Benchmark deck failed to convert")
+        manifest = job["deck"]
+        slide_url = f"/slides/{upload['deck_id']}/Slide1.jpg?v={manifest['versions']['1']}"
+        async with session.get(f"{base}{slide_url}", headers={"Accept": "image/webp"}) as response:
+            etag = response.headers["ETag"]
+    return [
+        ("job_status", upload["status_url"], {}),
+        ("slide_fetch", slide_url, {"Accept": "image/webp"}),
+        ("slide_revalidate", slide_url, {"Accept": "image/webp", "If-None-Match": etag}),
+        ("connection_details", f"/api/connection-details?deck_id={upload['deck_id']}", {}),
+    ]
+
+
+async def client(base, requests, plan, latencies, errors):
+    # One connection per client, like one browser tab
+    connector = aiohttp.TCPConnector(limit=1)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for i in range(requests):
+            _, path, headers = plan[i % len(plan)]
+            start = time.perf_counter()
+            try:
+                async with session.get(f"{base}{path}", headers=headers) as response:
+                    await response.read()
+                    if response.status >= 400:
+                        errors.append(response.status)
+            except aiohttp.ClientError as e:
+                errors.append(type(e).__name__)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+
+async def level(base, concurrency, requests, plan):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(base, requests, plan, latencies, errors) for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "per_second": round(len(latencies) / wall, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", default="waitress,asgi")
+    parser.add_argument("--concurrency", default="10,100,500")
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--slides", type=int, default=10)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ppt-serverbench-")
+    deck_path = make_deck(os.path.join(workdir, "deck.pptx"), args.slides, seed=time.time_ns())
+    results = {}
+    for mode in args.modes.split(","):
+        if mode == "asgi" and importlib.util.find_spec("uvicorn") is None:
+            print("⚠️ uvicorn is not installed; skipping asgi", file=sys.stderr)
+            continue
+        proc, base = start(mode, workdir)
+        try:
+            plan = asyncio.run(prepare(base, deck_path))
+            results[mode] = [asyncio.run(level(base, int(c), args.requests, plan))
+                             for c in args.concurrency.split(",")]
+        finally:
+            proc.terminate()
+            proc.wait()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<10}{'clients':>9}{'requests':>10}{'per s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for mode, rows in results.items():
+        for row in rows:
+            print(f"{mode:<10}{row['concurrency']:>9}{row['requests']:>10}{row['per_second']:>10}"
+                  f"{row['p50_ms']:>10}{row['p99_ms']:>10}{row['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Synthetic .pptx decks for benchmarks, built with python-pptx.
+
+Text-heavy slides carry a title, bullets and speaker notes; image-heavy
+slides add full-colour noise pictures, which compress about as badly as
+photos do. The same seed always gives the same deck (and so the same deck
+id); change it to force a fresh conversion.
+"""
+import io
+import random
+
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Inches, Pt
+
+WORDS = (
+    "revenue growth margin pipeline customer churn retention launch roadmap "
+    "quarter forecast budget hiring platform latency reliability security "
+    "pricing market segment partner onboarding analytics dashboard strategy "
+    "milestone risk mitigation capacity region expansion support adoption"
+).split()
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _noise_picture(rng, width=960, height=540):
+    image = Image.frombytes("RGB", (width, height), rng.randbytes(width * height * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def make_deck(path, slide_count, seed=0, bullets=5, images=0):
+    """Write a deck of slide_count slides to path; images = pictures per slide."""
+    rng = random.Random(seed)
+    prs = Presentation()
+    prs.slide_width, prs.slide_height = Inches(13.333), Inches(7.5)
+    layout = prs.slide_layouts[1]  # Title and Content
+
+    for number in range(1, slide_count + 1):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"{number}. {_sentence(rng, 4)}"
+        body = slide.placeholders[1].text_frame
+        body.text = _sentence(rng, 10)
+        for _ in range(bullets - 1):
+            paragraph = body.add_paragraph()
+            paragraph.text = _sentence(rng, 10)
+            paragraph.font.size = Pt(18)
+        for i in range(images):
+            slide.shapes.add_picture(_noise_picture(rng), Inches(7 + i * 0.5), Inches(2 + i * 0.5),
+                                     width=Inches(5))
+        slide.notes_slide.notes_text_frame.text = _sentence(rng, 30)
+
+    prs.save(path)
+    return path
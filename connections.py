@@ -0,0 +1,190 @@
+"""LiveKit connection details: room names and participant tokens.
+
+The LiveKit URL and keys are read once. Tokens are short-lived; with
+TOKEN_REUSE_SECONDS set, a client that asks again for the same deck within
+that window (a reload, a double click) gets its previous room and token back
+instead of a freshly signed one. Requests are rate limited per client IP,
+and pre-provisioning many rooms at once (events, classrooms) goes through a
+bulk call guarded by BULK_API_KEY. With a RoomProvisioner (rooms.py), a
+viewer's room is also created, with the agent dispatched, before its token
+is returned. Bulk rooms are not created up front: their tokens dispatch the
+agent when the first participant joins, so unused rooms start no session.
+"""
+import os
+import hmac
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from livekit import api
+
+logger = logging.getLogger('ppt-connections')
+
+# How long a minted token can be used to join
+TOKEN_TTL_SECONDS = int(os.environ.get("TOKEN_TTL_SECONDS", 600))
+# Hand the same room/token to a client asking again this soon (0 = never)
+TOKEN_REUSE_SECONDS = int(os.environ.get("TOKEN_REUSE_SECONDS", 0))
+TOKEN_REUSE_MAX_CLIENTS = int(os.environ.get("TOKEN_REUSE_MAX_CLIENTS", 10000))
+# Per client IP: sustained requests per minute, and how many may come at once
+RATE_LIMIT_PER_MINUTE = float(os.environ.get("RATE_LIMIT_PER_MINUTE", 30))
+RATE_LIMIT_BURST = int(os.environ.get("RATE_LIMIT_BURST", 10))
+BULK_MAX_ROOMS = int(os.environ.get("BULK_MAX_ROOMS", 200))
+
+
+class ConnectionDetailsError(Exception):
+    """Request that cannot be served; status is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class LiveKitConfig:
+    def __init__(self, url, api_key, api_secret, bulk_api_key=None):
+        self.url = url
+        self.api_key = api_key
+        self.api_secret = api_secret
+        # Bulk provisioning is disabled unless a key is configured
+        self.bulk_api_key = bulk_api_key
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv('LIVEKIT_URL'), os.getenv('LIVEKIT_API_KEY'), os.getenv('LIVEKIT_API_SECRET'),
+                   os.getenv('BULK_API_KEY'))
+
+    @property
+    def complete(self):
+        return all([self.url, self.api_key, self.api_secret])
+
+
+class RateLimiter:
+    """Token bucket per key (client IP); idle buckets are dropped once full again."""
+
+    def __init__(self, per_minute=RATE_LIMIT_PER_MINUTE, burst=RATE_LIMIT_BURST):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._pruned_at = time.monotonic()
+
+    def acquire(self, key, cost=1):
+        """Take cost tokens for key; returns 0 if allowed, else seconds to wait."""
+        if self.rate <= 0:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < cost:
+                self._buckets[key] = (tokens, now)
+                return (cost - tokens) / self.rate
+            self._buckets[key] = (tokens - cost, now)
+            if now - self._pruned_at > 60:
+                self._prune(now)
+            return 0
+
+    def _prune(self, now):
+        refill = self.burst / self.rate
+        self._buckets = {key: value for key, value in self._buckets.items() if now - value[1] < refill}
+        self._pruned_at = now
+
+
+class ConnectionService:
+    """Mints room names and participant tokens from config loaded once."""
+
+    def __init__(self, config=None, rooms=None, ttl=TOKEN_TTL_SECONDS, reuse_seconds=TOKEN_REUSE_SECONDS):
+        self.config = config or LiveKitConfig.from_env()
+        self.rooms = rooms if rooms is not None and rooms.enabled else None
+        self.ttl = ttl
+        self.reuse_seconds = min(reuse_seconds, ttl // 2)
+        self.limiter = RateLimiter()
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _mint(self, room_name, identity, deck_id, name="User", room_config=None):
+        token = api.AccessToken(self.config.api_key, self.config.api_secret) \
+            .with_identity(identity) \
+            .with_name(name) \
+            .with_ttl(timedelta(seconds=self.ttl)) \
+            .with_metadata(json.dumps({"deck_id": deck_id})) \
+            .with_grants(api.VideoGrants(
+                room_join=True,
+                room=room_name,
+                can_publish=True,
+                can_subscribe=True,
+            ))
+        if room_config is not None:
+            token = token.with_room_config(room_config)
+        return token.to_jwt()
+
+    def _details(self, deck_id, room_name=None, name="User", dispatch_on_join=False):
+        prewarmed = False
+        room_config = None
+        if room_name is None and self.rooms:
+            room_name = self.rooms.claim(deck_id)
+            prewarmed = room_name is not None
+        room_name = room_name or f"ppt_session_{os.urandom(4).hex()}"
+        if self.rooms and dispatch_on_join:
+            room_config = self.rooms.dispatch_config(deck_id)
+        elif self.rooms and not prewarmed:
+            try:
+                self.rooms.create(room_name, deck_id)
+            except Exception as e:
+                raise ConnectionDetailsError("Could not start a presenter, try again", 503) from e
+        identity = f"user_{os.urandom(4).hex()}"
+        return {
+            "serverUrl": self.config.url,
+            "roomName": room_name,
+            "deckId": deck_id,
+            "participantIdentity": identity,
+            "participantToken": self._mint(room_name, identity, deck_id, name, room_config),
+            "agentDispatched": self.rooms is not None and not dispatch_on_join,
+            "prewarmed": prewarmed,
+        }
+
+    def _check(self, client_ip, cost=1):
+        if not self.config.complete:
+            raise ConnectionDetailsError("Missing Keys", 500)
+        retry_after = self.limiter.acquire(client_ip, cost)
+        if retry_after:
+            raise ConnectionDetailsError("Too many requests", 429, retry_after=retry_after)
+
+    def issue(self, deck_id, client_ip, client_id=None):
+        """Connection details for one viewer; returns (details, reused)."""
+        key = (client_id, deck_id)
+        if client_id and self.reuse_seconds:
+            with self._lock:
+                entry = self._recent.get(key)
+                if entry and time.monotonic() - entry[0] < self.reuse_seconds:
+                    self._recent.move_to_end(key)
+                    return entry[1], True
+
+        self._check(client_ip)
+        details = self._details(deck_id)
+        if client_id and self.reuse_seconds:
+            with self._lock:
+                self._recent[key] = (time.monotonic(), details)
+                self._recent.move_to_end(key)
+                while len(self._recent) > TOKEN_REUSE_MAX_CLIENTS:
+                    self._recent.popitem(last=False)
+        return details, False
+
+    def bulk(self, count, deck_id, client_ip, api_key, prefix="ppt_event"):
+        """Pre-provision count rooms, one viewer token each; the agent is
+        dispatched into a room only once someone joins it."""
+        expected = self.config.bulk_api_key
+        if not expected or not hmac.compare_digest(api_key or "", expected):
+            raise ConnectionDetailsError("Bulk provisioning is not enabled for this key", 403)
+        if not isinstance(count, int) or not 0 < count <= BULK_MAX_ROOMS:
+            raise ConnectionDetailsError(f"count must be between 1 and {BULK_MAX_ROOMS}")
+        # One bucket entry per call: the key holder is trusted, the IP still limited
+        self._check(client_ip)
+        batch = os.urandom(3).hex()
+        rooms = [self._details(deck_id, room_name=f"{prefix}_{batch}_{i + 1}", dispatch_on_join=True)
+                 for i in range(count)]
+        logger.info(f"🎟️ Provisioned {count} rooms ({prefix}_{batch}_*) for deck {deck_id}")
+        return rooms
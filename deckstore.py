@@ -0,0 +1,317 @@
+"""Per-deck workspaces shared by the web server and the agent.
+
+Every upload is stored under decks/<deck_id>/ where deck_id hashes the .pptx
+contents together with the render settings (see deck_key), so concurrent
+conversions never touch each other's files and identical uploads are reused:
+
+    decks/<deck_id>/Slide{n}.jpg
+    decks/<deck_id>/presentation.json
+    decks/<deck_id>/manifest.json
+
+presentation.json (slide text) is written before any image exists and
+manifest.json lists which slides have been rendered, so a deck can be
+presented while the rest of it is still converting.
+"""
+import os
+import re
+import json
+import shutil
+import hashlib
+import functools
+import time
+import tempfile
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DECKS_FOLDER = os.environ.get("DECKS_FOLDER", os.path.join(BASE_DIR, "decks"))
+
+_DECK_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=4096)
+def _etag_for(path, mtime_ns, size):
+    return hash_file(path)[:32]
+
+
+def file_etag(path):
+    """Strong ETag for a file, hashed once per (path, mtime, size)."""
+    stat = os.stat(path)
+    return _etag_for(path, stat.st_mtime_ns, stat.st_size)
+
+
+def is_deck_id(value):
+    return bool(value) and bool(_DECK_ID_RE.match(value))
+
+
+def deck_dir(deck_id):
+    if not is_deck_id(deck_id):
+        raise ValueError(f"Invalid deck id: {deck_id!r}")
+    return os.path.join(DECKS_FOLDER, deck_id)
+
+
+def presentation_path(deck_id):
+    return os.path.join(deck_dir(deck_id), "presentation.json")
+
+
+def manifest_path(deck_id):
+    return os.path.join(deck_dir(deck_id), "manifest.json")
+
+
+def search_index_path(deck_id):
+    return os.path.join(deck_dir(deck_id), "search.npz")
+
+
+def slide_url(deck_id, slide_number, version=None):
+    """URL of a slide image; with a content version it is safe to cache forever."""
+    url = file_url(deck_id, f"Slide{slide_number}.jpg")
+    return f"{url}?v={version}" if version else url
+
+
+def published_slide_url(deck_id, slide_number, manifest=None):
+    """Versioned slide URL as recorded in the deck's manifest (read if not given)."""
+    if manifest is None:
+        manifest = load_manifest(deck_id) or {}
+    return slide_url(deck_id, slide_number, manifest.get("versions", {}).get(str(slide_number)))
+
+
+def file_url(deck_id, filename):
+    return f"/slides/{deck_id}/{filename}"
+
+
+def deck_exists(deck_id):
+    """True once a deck's text is published, unless its conversion failed."""
+    if not is_deck_id(deck_id) or not os.path.exists(presentation_path(deck_id)):
+        return False
+    manifest = load_manifest(deck_id)
+    return not manifest or manifest.get("status") != "failed"
+
+
+def load_presentation(deck_id):
+    """Return the slide list for a deck, or None if there is none yet."""
+    if not deck_exists(deck_id):
+        return None
+    with open(presentation_path(deck_id), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_manifest(deck_id):
+    try:
+        with open(manifest_path(deck_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def deck_ready(deck_id):
+    """True once every slide of the deck has been converted."""
+    manifest = load_manifest(deck_id) if is_deck_id(deck_id) else None
+    return bool(manifest) and manifest.get("status") == "ready"
+
+
+def slide_ready(deck_id, slide_number, manifest=None):
+    if manifest is None:
+        manifest = load_manifest(deck_id)
+    if not manifest:
+        return False
+    return manifest.get("status") == "ready" or slide_number in manifest.get("ready", [])
+
+
+def _write_json(path, data, **dump_kwargs):
+    # Write to a temp file first so readers never see a half-written file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".json.tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, **dump_kwargs)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_presentation(deck_id, slides_data):
+    # Compact: the agent loads this on every session start
+    _write_json(presentation_path(deck_id), slides_data, separators=(",", ":"))
+
+
+class DeckBuild:
+    """Publishes per-slide readiness of a deck while it is being converted."""
+
+    def __init__(self, deck_id, slide_count=None):
+        self.deck_id = deck_id
+        self.slide_count = slide_count
+        self.ready = set()
+        self.renditions = {}
+        self.versions = {}
+        self.status = "building"
+        self._lock = threading.Lock()
+        self._write()
+
+    def mark_ready(self, slide_number, renditions=None, version=None):
+        """version is a content hash of the slide image, used in its URL."""
+        with self._lock:
+            self.ready.add(slide_number)
+            if renditions:
+                self.renditions[slide_number] = renditions
+            if version:
+                self.versions[slide_number] = version
+            self._write()
+
+    def set_slide_count(self, slide_count):
+        with self._lock:
+            self.slide_count = slide_count
+            self._write()
+
+    def finish(self):
+        with self._lock:
+            self.status = "ready"
+            self._write()
+
+    def fail(self):
+        with self._lock:
+            self.status = "failed"
+            self._write()
+
+    def _write(self):
+        _write_json(manifest_path(self.deck_id), {
+            "deck_id": self.deck_id,
+            "status": self.status,
+            "slide_count": self.slide_count,
+            "ready": sorted(self.ready),
+            "renditions": {str(n): r for n, r in sorted(self.renditions.items())},
+            "versions": {str(n): v for n, v in sorted(self.versions.items())},
+            "updated_at": time.time(),
+        })
+
+
+def deck_key(file_hash, render_settings):
+    """Deck id for a file rendered with specific settings."""
+    fingerprint = json.dumps(render_settings, sort_keys=True)
+    return hashlib.sha256(f"{file_hash}:{fingerprint}".encode("utf-8")).hexdigest()
+
+
+# Converted decks are kept on disk and reused until this budget is exceeded
+DECK_CACHE_MAX_BYTES = int(os.environ.get("DECK_CACHE_MAX_MB", 2048)) * 1024 * 1024
+
+
+class DeckCache:
+    """Size-bounded LRU over the finished deck workspaces in DECKS_FOLDER.
+
+    Recency is tracked with a .last_used marker per deck so presentation.json
+    keeps its original mtime.
+    """
+
+    MARKER = ".last_used"
+
+    def __init__(self, max_bytes=DECK_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, deck_id):
+        """Return the cached slide list for deck_id, or None on a miss."""
+        slides_data = None
+        try:
+            if deck_ready(deck_id):
+                slides_data = load_presentation(deck_id)
+        except (OSError, ValueError):
+            pass
+        with self._lock:
+            if slides_data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self.touch(deck_id)
+        return slides_data
+
+    def touch(self, deck_id):
+        marker = os.path.join(deck_dir(deck_id), self.MARKER)
+        try:
+            with open(marker, "a"):
+                os.utime(marker, None)
+        except OSError:
+            pass
+
+    def evict(self, keep=()):
+        """Delete least recently used decks until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        if not os.path.isdir(DECKS_FOLDER):
+            return 0
+        for deck_id in os.listdir(DECKS_FOLDER):
+            if not is_deck_id(deck_id):
+                continue
+            folder = os.path.join(DECKS_FOLDER, deck_id)
+            size = _folder_size(folder)
+            total += size
+            marker = os.path.join(folder, self.MARKER)
+            try:
+                last_used = os.path.getmtime(marker)
+            except OSError:
+                try:
+                    last_used = os.path.getmtime(folder)
+                except OSError:
+                    continue
+            entries.append((last_used, deck_id, size))
+
+        removed = 0
+        for _, deck_id, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if deck_id in keep:
+                continue
+            shutil.rmtree(os.path.join(DECKS_FOLDER, deck_id), ignore_errors=True)
+            total -= size
+            removed += 1
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def recent_deck_ids(limit):
+    """Ids of finished decks, most recently used first."""
+    entries = []
+    if not os.path.isdir(DECKS_FOLDER):
+        return []
+    for deck_id in os.listdir(DECKS_FOLDER):
+        if not deck_ready(deck_id):
+            continue
+        folder = os.path.join(DECKS_FOLDER, deck_id)
+        try:
+            last_used = os.path.getmtime(os.path.join(folder, DeckCache.MARKER))
+        except OSError:
+            last_used = os.path.getmtime(folder)
+        entries.append((last_used, deck_id))
+    return [deck_id for _, deck_id in sorted(entries, reverse=True)[:limit]]
+
+
+def _folder_size(folder):
+    total = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
@@ -0,0 +1,78 @@
+"""Structured text extraction from .pptx slides.
+
+Walks every shape on a slide, including grouped shapes and tables, and
+collects the speaker notes, producing one record per slide:
+
+    {"slide_number": 1, "title": "...", "bullets": [...],
+     "tables": [[["cell", ...], ...]], "notes": "...", "word_count": 42}
+"""
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+
+def _iter_shapes(shapes):
+    for shape in shapes:
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            yield from _iter_shapes(shape.shapes)
+        else:
+            yield shape
+
+
+def _table_rows(table):
+    return [[cell.text.strip() for cell in row.cells] for row in table.rows]
+
+
+def extract_slide(slide, slide_number):
+    title_shape = slide.shapes.title
+    title = title_shape.text.strip() if title_shape is not None and title_shape.has_text_frame else ""
+
+    bullets = []
+    tables = []
+    for shape in _iter_shapes(slide.shapes):
+        if title_shape is not None and shape.shape_id == title_shape.shape_id:
+            continue
+        if shape.has_text_frame:
+            for paragraph in shape.text_frame.paragraphs:
+                text = "".join(run.text for run in paragraph.runs).strip()
+                if text:
+                    bullets.append(text)
+        elif getattr(shape, "has_table", False):
+            tables.append(_table_rows(shape.table))
+
+    notes = ""
+    if slide.has_notes_slide:
+        frame = slide.notes_slide.notes_text_frame
+        notes = frame.text.strip() if frame is not None else ""
+
+    words = [title, *bullets, *(cell for table in tables for row in table for cell in row)]
+    return {
+        "slide_number": slide_number,
+        "title": title,
+        "bullets": bullets,
+        "tables": tables,
+        "notes": notes,
+        "word_count": sum(len(text.split()) for text in words),
+    }
+
+
+def flatten(record):
+    """Single-string summary of a slide, as the agent prompt used to get it."""
+    parts = []
+    if record["title"]:
+        parts.append(f"Title: {record['title']}")
+    parts.extend(record["bullets"])
+    for table in record["tables"]:
+        parts.extend(" | ".join(row) for row in table)
+    return " ".join(parts)
+
+
+def extract_slides(ppt_path, on_slide=None):
+    """Extract every slide of ppt_path; on_slide(done, total) reports progress."""
+    prs = Presentation(ppt_path)
+    total = len(prs.slides)
+    records = []
+    for i, slide in enumerate(prs.slides, start=1):
+        records.append(extract_slide(slide, i))
+        if on_slide:
+            on_slide(i, total)
+    return records
@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('ppt-jobs')
+
+# Conversion stages reported by /api/jobs/<id>
+STAGES = ("pdf", "rasterize", "text")
+
+# Bounded pool so uploads never eat the web server's request threads
+CONVERSION_WORKERS = int(os.environ.get("CONVERSION_WORKERS", 2))
+# Finished jobs are forgotten after this many seconds
+JOB_TTL_SECONDS = int(os.environ.get("JOB_TTL_SECONDS", 3600))
+
+FINISHED = ("done", "failed")
+
+
+def sse_message(event):
+    """One server-sent event; the seq doubles as the id browsers resume from."""
+    return (f"id: {event['seq']}\nevent: {event['type']}\n"
+            f"data: {json.dumps(event, separators=(',', ':'))}\n\n")
+
+
+class Job:
+    """State of one upload conversion, updated by the worker thread.
+
+    Every change is also appended to an event log (progress, slide, status)
+    that /api/jobs/<id>/events streams and clients resume by seq. Threads
+    wait for changes with wait_events, event loops (asgi.py) with wait_until.
+    """
+
+    def __init__(self, key=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = "queued"
+        self.stages = {name: {"status": "pending", "done": 0, "total": 0} for name in STAGES}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.events = []
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._waiters = []
+
+    @property
+    def finished(self):
+        return self.status in FINISHED
+
+    def _touch(self):
+        # Caller holds the lock; wakes waiting threads and event loops
+        self.updated_at = time.time()
+        self._changed.notify_all()
+        for loop, event in self._waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _emit(self, event_type, **fields):
+        # Caller holds the lock
+        self.events.append({"seq": len(self.events) + 1, "type": event_type, **fields})
+        self._touch()
+
+    def events_since(self, seq):
+        with self._lock:
+            return self.events[seq:]
+
+    def wait_events(self, seq, timeout):
+        """Events after seq, waiting up to timeout for one if there are none yet."""
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.events) > seq or self.finished, timeout)
+            return self.events[seq:]
+
+    async def wait_until(self, predicate, timeout):
+        """On an event loop, wait up to timeout for predicate() to hold.
+
+        predicate is checked under the job's lock each time the job changes,
+        so it may read job fields but must not call job methods. Returns
+        whether it held.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        event = asyncio.Event()
+        waiter = (loop, event)
+        with self._lock:
+            self._waiters.append(waiter)
+        try:
+            while True:
+                with self._lock:
+                    if predicate():
+                        return True
+                    event.clear()
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._lock:
+                self._waiters.remove(waiter)
+
+    def start_stage(self, stage, total=0):
+        with self._lock:
+            self.stages[stage].update(status="running", done=0, total=total)
+            self._touch()
+
+    def advance_stage(self, stage, done, total=None):
+        with self._lock:
+            self.stages[stage]["done"] = done
+            if total is not None:
+                self.stages[stage]["total"] = total
+            self._touch()
+
+    def finish_stage(self, stage):
+        with self._lock:
+            info = self.stages[stage]
+            info["status"] = "done"
+            info["done"] = info["total"] = max(info["done"], info["total"])
+            self._touch()
+
+    def progress(self, stage, done, total, slide=None):
+        """Callback handed to process_ppt; slide describes a newly published slide."""
+        info = self.stages[stage]
+        if info["status"] == "pending":
+            self.start_stage(stage, total)
+        self.advance_stage(stage, done, total)
+        if total and done >= total:
+            self.finish_stage(stage)
+        with self._lock:
+            if slide:
+                self._emit("slide", **slide)
+            self._emit("progress", stage=stage, **self.stages[stage])
+
+    def settle(self, status, result=None, error=None):
+        with self._lock:
+            self.result = result
+            self.error = error
+            self.status = status
+            self._emit("status", status=status, result=result, error=error)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "stages": {name: dict(info) for name, info in self.stages.items()},
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "updated_at": self.updated_at,
+            }
+
+
+class JobManager:
+    """Runs conversions on a bounded thread pool and keeps their status."""
+
+    def __init__(self, max_workers=CONVERSION_WORKERS, ttl=JOB_TTL_SECONDS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="convert")
+        self.ttl = ttl
+        self._jobs = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, key=None, **kwargs):
+        """Queue fn(*args, progress=job.progress, **kwargs) and return the Job.
+
+        Jobs sharing a key (e.g. a deck id) are coalesced: while one is queued
+        or running, submitting the same key returns the existing job.
+        """
+        with self._lock:
+            self._prune()
+            if key is not None and key in self._inflight:
+                return self._inflight[key]
+            job = Job(key=key)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._inflight[key] = job
+        self.executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def complete(self, result, slides=()):
+        """Record a job that finished without running (e.g. a cache hit).
+
+        slides are replayed as slide events so streaming clients see them too.
+        """
+        job = Job()
+        for stage in STAGES:
+            job.finish_stage(stage)
+        with job._lock:
+            for slide in slides:
+                job._emit("slide", **slide)
+        job.settle("done", result)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def inflight_keys(self):
+        with self._lock:
+            return set(self._inflight)
+
+    def _run(self, job, fn, args, kwargs):
+        job.settle("running")
+        try:
+            result = fn(*args, progress=job.progress, **kwargs)
+            if not result:
+                raise RuntimeError("Processing failed")
+            job.settle("done", result)
+        except Exception as e:
+            logger.error(f"❌ Job {job.id} failed: {e}")
+            job.settle("failed", error=str(e))
+        with self._lock:
+            if job.key is not None and self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and job.updated_at < cutoff:
+                del self._jobs[job_id]
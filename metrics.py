@@ -0,0 +1,86 @@
+"""Prometheus metrics for the web server.
+
+    ppt_http_request_seconds{method,route,status}   latency per Flask route
+    ppt_http_requests_in_flight                     requests being handled
+    ppt_waitress_threads / _busy_threads / _queue   request thread saturation
+    ppt_conversion_stage_seconds{stage}             time per process_ppt stage
+    ppt_conversion_jobs_total{result}               finished conversions
+    ppt_connection_tokens_total{outcome}            minted, reused, rate_limited
+
+Conversion stages: office (LibreOffice, including the wait for a free
+instance), rasterize, renditions (per slide), text, save and total.
+"""
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+REQUEST_SECONDS = Histogram(
+    "ppt_http_request_seconds",
+    "Flask request latency",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge("ppt_http_requests_in_flight", "Requests currently being handled")
+
+WAITRESS_THREADS = Gauge("ppt_waitress_threads", "Configured waitress request threads")
+WAITRESS_BUSY = Gauge("ppt_waitress_busy_threads", "Waitress threads handling a request")
+WAITRESS_QUEUE = Gauge("ppt_waitress_queue_depth", "Requests waiting for a waitress thread")
+
+CONVERSION_STAGE_SECONDS = Histogram(
+    "ppt_conversion_stage_seconds",
+    "Time spent in each stage of a deck conversion",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600),
+)
+CONVERSION_JOBS = Counter("ppt_conversion_jobs_total", "Finished deck conversions", ["result"])
+CONNECTION_TOKENS = Counter("ppt_connection_tokens_total", "Connection details handed out", ["outcome"])
+
+
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        CONVERSION_STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc()
+
+
+def _after_request(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+def _teardown_request(error=None):
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return
+    REQUESTS_IN_FLIGHT.dec()
+    status = g.pop("metrics_status", 500)
+    REQUEST_SECONDS.labels(request.method, _route(), str(status)).observe(time.perf_counter() - start)
+
+
+def instrument(app):
+    """Time every request of app and serve the registry at /metrics."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule("/metrics", "metrics", lambda: (generate_latest(), 200,
+                                                     {"Content-Type": CONTENT_TYPE_LATEST}))
+
+
+def watch_waitress(server, threads):
+    """Export the thread use of a waitress server made with create_server()."""
+    dispatcher = server.task_dispatcher
+    WAITRESS_THREADS.set(threads)
+    WAITRESS_BUSY.set_function(lambda: dispatcher.active_count)
+    WAITRESS_QUEUE.set_function(lambda: len(dispatcher.queue))
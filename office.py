@@ -0,0 +1,308 @@
+"""Warm LibreOffice converters for PPTX -> PDF.
+
+Instead of paying office startup on every upload, a ConverterPool keeps
+OFFICE_POOL_SIZE headless soffice processes running, each with its own user
+profile (two instances sharing a profile refuse to run side by side) and a
+UNO socket listener. Uploads queue for a free instance; hung or dead
+instances are killed and restarted.
+
+The warm instances need pyuno (`import uno`), which comes with the distro's
+LibreOffice packages rather than pip; the Dockerfile makes it importable.
+Without it every conversion falls back to a cold `soffice --convert-to`
+("cli" mode in /api/cache/stats), which is much slower per upload.
+
+Set OFFICE_CONVERTER=fake to use FakeConverter, which renders placeholder
+pages without LibreOffice (handy for tests and benchmarks).
+"""
+import os
+import time
+import queue
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+
+logger = logging.getLogger('ppt-office')
+
+OFFICE_CONVERTER = os.environ.get("OFFICE_CONVERTER", "soffice")
+OFFICE_BINARY = os.environ.get("OFFICE_BINARY") or shutil.which("soffice") or "libreoffice"
+OFFICE_POOL_SIZE = int(os.environ.get("OFFICE_POOL_SIZE", 2))
+OFFICE_BASE_PORT = int(os.environ.get("OFFICE_BASE_PORT", 2002))
+# A single conversion taking longer than this is treated as a hang
+OFFICE_TIMEOUT = float(os.environ.get("OFFICE_TIMEOUT", 120))
+# How long an upload may wait for a free converter
+OFFICE_QUEUE_TIMEOUT = float(os.environ.get("OFFICE_QUEUE_TIMEOUT", 600))
+OFFICE_START_TIMEOUT = float(os.environ.get("OFFICE_START_TIMEOUT", 30))
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+except ImportError:  # pyuno ships with LibreOffice, not pip
+    uno = None
+
+
+class ConversionError(Exception):
+    pass
+
+
+def _pdf_path(src, outdir):
+    base_name = os.path.splitext(os.path.basename(src))[0]
+    return os.path.join(outdir, f"{base_name}.pdf")
+
+
+def _props(**values):
+    return tuple(PropertyValue(Name=name, Value=value) for name, value in values.items())
+
+
+class SofficeConverter:
+    """One headless soffice instance with a private profile.
+
+    With pyuno available the process stays up and documents are converted
+    over its socket. Without it each conversion runs `soffice --convert-to`,
+    still against this instance's private profile so runs don't collide.
+    """
+
+    mode = "uno" if uno is not None else "cli"
+
+    def __init__(self, index, binary=OFFICE_BINARY):
+        self.index = index
+        self.binary = binary
+        self.port = OFFICE_BASE_PORT + index
+        self.profile_dir = tempfile.mkdtemp(prefix=f"lo_profile_{index}_")
+        self.profile_url = Path(self.profile_dir).as_uri()
+        self.process = None
+        self.desktop = None
+
+    def start(self):
+        if uno is None:
+            return
+        self.process = subprocess.Popen([
+            self.binary, "--headless", "--invisible", "--nologo", "--norestore",
+            "--nodefault", "--nofirststartwizard",
+            f"-env:UserInstallation={self.profile_url}",
+            f"--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext",
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.desktop = self._connect()
+        logger.info(f"🟢 soffice #{self.index} listening on port {self.port}")
+
+    def _connect(self):
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local)
+        url = f"uno:socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+        deadline = time.monotonic() + OFFICE_START_TIMEOUT
+        while True:
+            if self.process.poll() is not None:
+                raise ConversionError(f"soffice #{self.index} exited during startup")
+            try:
+                ctx = resolver.resolve(url)
+                return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+            except Exception:
+                if time.monotonic() > deadline:
+                    raise ConversionError(f"soffice #{self.index} did not start listening")
+                time.sleep(0.25)
+
+    def running(self):
+        """Whether a warm soffice process is up (never, in cli mode)."""
+        return self.process is not None and self.process.poll() is None
+
+    def healthy(self):
+        if uno is None:
+            return True
+        if self.process is None or self.process.poll() is not None:
+            return False
+        try:
+            self.desktop.getCurrentComponent()
+            return True
+        except Exception:
+            return False
+
+    def convert(self, src, outdir, timeout=OFFICE_TIMEOUT):
+        if uno is None:
+            return self._convert_cli(src, outdir, timeout)
+
+        # Kill the instance if UNO never answers; the blocked call then fails
+        watchdog = threading.Timer(timeout, self.stop)
+        watchdog.daemon = True
+        watchdog.start()
+        pdf_path = _pdf_path(src, outdir)
+        try:
+            doc = self.desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(os.path.abspath(src)), "_blank", 0, _props(Hidden=True))
+            try:
+                doc.storeToURL(uno.systemPathToFileUrl(pdf_path), _props(FilterName="impress_pdf_Export"))
+            finally:
+                doc.close(True)
+        except Exception as e:
+            raise ConversionError(f"soffice #{self.index} failed on {os.path.basename(src)}: {e}")
+        finally:
+            watchdog.cancel()
+        return pdf_path
+
+    def _convert_cli(self, src, outdir, timeout):
+        cmd = [
+            self.binary, "--headless", "--invisible", "--nodefault", "--nofirststartwizard",
+            f"-env:UserInstallation={self.profile_url}",
+            "--convert-to", "pdf",
+            "--outdir", outdir,
+            os.path.abspath(src)
+        ]
+        try:
+            subprocess.run(cmd, check=True, timeout=timeout,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except (subprocess.SubprocessError, OSError) as e:
+            raise ConversionError(f"LibreOffice failed on {os.path.basename(src)}: {e}")
+        return _pdf_path(src, outdir)
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.kill()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                pass
+        self.process = None
+        self.desktop = None
+
+    def close(self):
+        self.stop()
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+class FakeConverter:
+    """Stand-in that writes one blank page per slide, no LibreOffice needed."""
+
+    mode = "fake"
+
+    def __init__(self, index=0, delay=None):
+        self.index = index
+        self.delay = float(os.environ.get("FAKE_CONVERT_DELAY", 0)) if delay is None else delay
+        self.started = False
+
+    def start(self):
+        self.started = True
+
+    def running(self):
+        return self.started
+
+    def healthy(self):
+        return True
+
+    def convert(self, src, outdir, timeout=OFFICE_TIMEOUT):
+        from PIL import Image, ImageDraw
+        from pptx import Presentation
+
+        prs = Presentation(src)
+        size = (int(prs.slide_width / 9525), int(prs.slide_height / 9525))  # EMU -> px at 96 DPI
+        pages = []
+        for i, _ in enumerate(prs.slides, start=1):
+            page = Image.new("RGB", size, "white")
+            ImageDraw.Draw(page).text((20, 20), f"Slide {i}", fill="black")
+            pages.append(page)
+        if not pages:
+            raise ConversionError("Presentation has no slides")
+        if self.delay:
+            time.sleep(self.delay)
+
+        pdf_path = _pdf_path(src, outdir)
+        pages[0].save(pdf_path, "PDF", save_all=True, append_images=pages[1:])
+        return pdf_path
+
+    def stop(self):
+        self.started = False
+
+    def close(self):
+        self.stop()
+
+
+CONVERTERS = {
+    "soffice": SofficeConverter,
+    "fake": FakeConverter,
+}
+
+
+class ConverterPool:
+    """Hands out idle converters; callers queue when all are busy."""
+
+    def __init__(self, size=OFFICE_POOL_SIZE, factory=None,
+                 timeout=OFFICE_TIMEOUT, queue_timeout=OFFICE_QUEUE_TIMEOUT):
+        self.size = size
+        self.factory = factory or CONVERTERS[OFFICE_CONVERTER]
+        self.mode = getattr(self.factory, "mode", "custom")
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.restarts = 0
+        self._converters = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Boot every converter. Called lazily by convert() if needed."""
+        with self._lock:
+            if self._converters:
+                return
+            if self.mode == "cli":
+                logger.warning("⚠️ pyuno is not importable: every conversion starts a cold soffice")
+            for index in range(self.size):
+                converter = self.factory(index)
+                try:
+                    converter.start()
+                except Exception as e:
+                    # Leave it in the pool; the health check retries on checkout
+                    logger.error(f"❌ Converter #{index} failed to start: {e}")
+                self._converters.append(converter)
+                self._idle.put(converter)
+
+    def convert(self, src, outdir):
+        """Convert src to PDF inside outdir and return the PDF path."""
+        self.start()
+        try:
+            converter = self._idle.get(timeout=self.queue_timeout)
+        except queue.Empty:
+            raise ConversionError("All converters are busy")
+
+        try:
+            if not converter.healthy():
+                self._restart(converter)
+            return converter.convert(src, outdir, timeout=self.timeout)
+        except Exception:
+            # A bad file is not the instance's fault; a killed/hung one is
+            if not converter.healthy():
+                self._restart(converter)
+            raise
+        finally:
+            self._idle.put(converter)
+
+    def _restart(self, converter):
+        logger.warning(f"⚠️ Restarting converter #{converter.index}")
+        self.restarts += 1
+        converter.stop()
+        try:
+            converter.start()
+        except Exception as e:
+            logger.error(f"❌ Converter #{converter.index} failed to restart: {e}")
+
+    def status(self):
+        """Pool state for /api/cache/stats. mode is "uno" (warm instances),
+        "cli" (a cold soffice per conversion) or "fake"; only instances that
+        were started and are still up count as running or healthy."""
+        converters = list(self._converters)
+        running = [c for c in converters if c.running()]
+        return {
+            "mode": self.mode,
+            "size": self.size,
+            "started": bool(converters),
+            "idle": self._idle.qsize(),
+            "running": len(running),
+            "healthy": sum(1 for c in running if c.healthy()),
+            "restarts": self.restarts,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            for converter in self._converters:
+                converter.close()
+            self._converters = []
+            self._idle = queue.Queue()
@@ -0,0 +1,81 @@
+"""Opt-in sampling profiler for the running server.
+
+A daemon thread snapshots every thread's stack each PROFILER_INTERVAL_MS
+and counts identical stacks. The result is in collapsed-stack format
+("frame;frame;frame count" per line), which flamegraph.pl and speedscope
+read directly. Sampling stops by itself after PROFILER_MAX_SECONDS.
+"""
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "").lower() in ("1", "true", "yes")
+PROFILER_INTERVAL_MS = float(os.environ.get("PROFILER_INTERVAL_MS", 10))
+PROFILER_MAX_SECONDS = float(os.environ.get("PROFILER_MAX_SECONDS", 300))
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    def __init__(self, interval_ms=PROFILER_INTERVAL_MS, max_seconds=PROFILER_MAX_SECONDS):
+        self.interval = interval_ms / 1000
+        self.max_seconds = max_seconds
+        self.samples = Counter()
+        self.started_at = None
+        self.stopped_at = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return False
+            self.samples = Counter()
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample, daemon=True, name="profiler")
+            self._thread.start()
+            return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _sample(self):
+        me = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            names.update((t.ident, t.name) for t in threading.enumerate())
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    self.samples[f"{names.get(ident, ident)};{_collapse(frame)}"] += 1
+        self.stopped_at = time.time()
+
+    def status(self):
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+            "interval_ms": self.interval * 1000,
+            "samples": sum(self.samples.values()),
+        }
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
@@ -0,0 +1,107 @@
+"""PDF -> slide JPEGs without holding the whole deck in memory.
+
+convert_from_path(pdf) decodes every page into a PIL image before anything
+is saved. Here pages are rendered in small first_page/last_page batches
+straight to disk by pdftoppm (pdf2image's output-folder mode), batches run
+in parallel, and each Slide{n}.jpg is published as soon as its batch lands.
+The number of parallel renders is capped so the estimated bitmap memory
+stays under RASTER_MAX_MEMORY_MB.
+"""
+import os
+import re
+import shutil
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+logger = logging.getLogger('ppt-rasterize')
+
+RASTER_DPI = int(os.environ.get("RENDER_DPI", 200))
+RASTER_JPEG_QUALITY = int(os.environ.get("RENDER_JPEG_QUALITY", 85))
+RASTER_BATCH_PAGES = int(os.environ.get("RASTER_BATCH_PAGES", 4))
+RASTER_WORKERS = int(os.environ.get("RASTER_WORKERS", os.cpu_count() or 1))
+RASTER_MAX_MEMORY_MB = int(os.environ.get("RASTER_MAX_MEMORY_MB", 512))
+
+# Fallback when pdfinfo doesn't report a page size: 13.33 x 7.5 in (16:9 slide)
+_DEFAULT_PAGE_PTS = (960.0, 540.0)
+
+
+def page_size_pts(info):
+    match = re.match(r"\s*([\d.]+)\s*x\s*([\d.]+)", info.get("Page size", ""))
+    if not match:
+        return _DEFAULT_PAGE_PTS
+    return float(match.group(1)), float(match.group(2))
+
+
+def render_workers(page_pts, dpi, max_workers=RASTER_WORKERS, max_memory_mb=RASTER_MAX_MEMORY_MB):
+    """How many pages may render at once within the memory budget."""
+    width_px = page_pts[0] / 72 * dpi
+    height_px = page_pts[1] / 72 * dpi
+    # RGB bitmap plus roughly the same again for the encoder's buffers
+    per_render = width_px * height_px * 3 * 2
+    by_memory = int(max_memory_mb * 1024 * 1024 // per_render)
+    return max(1, min(max_workers, by_memory))
+
+
+def rasterize_pdf(pdf_path, out_dir, dpi=RASTER_DPI, quality=RASTER_JPEG_QUALITY,
+                  batch_pages=RASTER_BATCH_PAGES, max_workers=RASTER_WORKERS,
+                  max_memory_mb=RASTER_MAX_MEMORY_MB, on_start=None, on_page=None):
+    """Render every page of pdf_path to out_dir/Slide{n}.jpg.
+
+    on_start(page_count) runs once the page count is known. on_page(page_number,
+    path) is called from the worker threads as each slide is written, so
+    per-page post-processing runs in parallel too. Returns the paths in page order.
+    """
+    info = pdfinfo_from_path(pdf_path)
+    page_count = int(info["Pages"])
+    if on_start:
+        on_start(page_count)
+    workers = render_workers(page_size_pts(info), dpi, max_workers, max_memory_mb)
+    batches = [
+        (first, min(first + batch_pages - 1, page_count))
+        for first in range(1, page_count + 1, batch_pages)
+    ]
+    logger.info(f"📸 Rasterizing {page_count} pages at {dpi} DPI with {workers} workers")
+
+    paths = [None] * page_count
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="raster") as executor:
+        futures = [
+            executor.submit(_render_batch, pdf_path, out_dir, first, last, dpi, quality, on_page)
+            for first, last in batches
+        ]
+        for future in as_completed(futures):
+            for page_number, path in future.result():
+                paths[page_number - 1] = path
+    return paths
+
+
+def _render_batch(pdf_path, out_dir, first, last, dpi, quality, on_page):
+    # Each batch renders into its own folder so pdftoppm names never clash
+    batch_dir = tempfile.mkdtemp(prefix=f".raster_{first}_", dir=out_dir)
+    try:
+        rendered = convert_from_path(
+            pdf_path,
+            dpi=dpi,
+            first_page=first,
+            last_page=last,
+            output_folder=batch_dir,
+            fmt="jpeg",
+            jpegopt={"quality": quality, "progressive": False, "optimize": False},
+            paths_only=True,
+            thread_count=1,
+        )
+        if len(rendered) != last - first + 1:
+            raise RuntimeError(f"Expected pages {first}-{last}, got {len(rendered)} images")
+
+        results = []
+        for page_number, rendered_path in zip(range(first, last + 1), rendered):
+            path = os.path.join(out_dir, f"Slide{page_number}.jpg")
+            os.replace(rendered_path, path)
+            results.append((page_number, path))
+            if on_page:
+                on_page(page_number, path)
+        return results
+    finally:
+        shutil.rmtree(batch_dir, ignore_errors=True)
@@ -0,0 +1,114 @@
+"""Per-slide rendition sets and picking the right one for a client.
+
+Next to the full-size Slide{n}.jpg every slide gets smaller copies and
+modern formats:
+
+    Slide{n}.jpg            full, JPEG (the original URL keeps working)
+    Slide{n}.full.webp
+    Slide{n}.screen.jpg     RENDITION_SCREEN_WIDTH wide
+    Slide{n}.screen.webp
+    Slide{n}.thumb.jpg      RENDITION_THUMB_WIDTH wide
+    Slide{n}.thumb.webp
+
+AVIF is added when listed in RENDITION_FORMATS and Pillow can encode it.
+"""
+import os
+import re
+import logging
+
+from PIL import Image, features
+
+logger = logging.getLogger('ppt-renditions')
+
+RENDITION_WIDTHS = {
+    "thumb": int(os.environ.get("RENDITION_THUMB_WIDTH", 320)),
+    "screen": int(os.environ.get("RENDITION_SCREEN_WIDTH", 1280)),
+}
+RENDITION_QUALITY = int(os.environ.get("RENDITION_QUALITY", 80))
+
+# Preferred first when the client accepts several
+_FORMAT_PREFERENCE = ("avif", "webp", "jpeg")
+_EXTENSIONS = {"jpeg": "jpg", "webp": "webp", "avif": "avif"}
+_MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp", "avif": "image/avif"}
+
+
+def _enabled_formats():
+    requested = os.environ.get("RENDITION_FORMATS", "jpeg,webp").split(",")
+    formats = ["jpeg"]
+    for name in (f.strip().lower() for f in requested):
+        if name in ("webp", "avif") and name not in formats:
+            if features.check(name):
+                formats.append(name)
+            else:
+                logger.warning(f"Pillow cannot encode {name}; skipping those renditions")
+    return formats
+
+
+RENDITION_FORMATS = _enabled_formats()
+
+_SLIDE_RE = re.compile(r"^Slide(\d+)\.jpg$")
+
+
+def rendition_filename(slide_number, size, fmt):
+    if size == "full" and fmt == "jpeg":
+        return f"Slide{slide_number}.jpg"
+    return f"Slide{slide_number}.{size}.{_EXTENSIONS[fmt]}"
+
+
+def make_renditions(full_path, slide_number):
+    """Write the rendition set next to full_path and describe it.
+
+    Returns {"full": {"width", "height", "jpeg": filename, ...}, "screen": ...}.
+    """
+    out_dir = os.path.dirname(full_path)
+    renditions = {}
+    with Image.open(full_path) as full:
+        full.load()
+        sizes = [("full", full)]
+        for size, width in RENDITION_WIDTHS.items():
+            if width < full.width:
+                height = round(full.height * width / full.width)
+                sizes.append((size, full.resize((width, height), Image.LANCZOS)))
+
+        for size, image in sizes:
+            entry = {"width": image.width, "height": image.height}
+            for fmt in RENDITION_FORMATS:
+                filename = rendition_filename(slide_number, size, fmt)
+                if not (size == "full" and fmt == "jpeg"):
+                    image.save(os.path.join(out_dir, filename), fmt.upper(), quality=RENDITION_QUALITY)
+                entry[fmt] = filename
+            renditions[size] = entry
+    return renditions
+
+
+def accepted_formats(accept_header):
+    accept = (accept_header or "").lower()
+    return [fmt for fmt in _FORMAT_PREFERENCE
+            if fmt == "jpeg" or _MIME_TYPES[fmt] in accept]
+
+
+def negotiate(folder, filename, accept_header, width=None, size=None):
+    """Pick the best existing rendition for a request of Slide{n}.jpg.
+
+    size names a rendition outright; otherwise width (the pixel width the
+    client will display) selects the smallest rendition at least that wide.
+    Returns filename unchanged for anything that isn't a base slide image.
+    """
+    match = _SLIDE_RE.match(filename)
+    if not match:
+        return filename
+    slide_number = int(match.group(1))
+
+    if size not in RENDITION_WIDTHS and size != "full":
+        size = "full"
+        if width:
+            fitting = [name for name, w in RENDITION_WIDTHS.items() if w >= width]
+            if fitting:
+                size = min(fitting, key=RENDITION_WIDTHS.get)
+
+    for candidate_size in dict.fromkeys((size, "full")):
+        for fmt in accepted_formats(accept_header):
+            candidate = rendition_filename(slide_number, candidate_size, fmt)
+            if os.path.exists(os.path.join(folder, candidate)):
+                return candidate
+    return filename
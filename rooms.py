@@ -0,0 +1,218 @@
+"""Pre-created LiveKit rooms with the presenter agent dispatched into them.
+
+With AGENT_NAME set (the agent worker must use the same name, see
+agent/capacity.py), a room is created the moment its token is minted, with
+the agent dispatched explicitly and the deck id in the dispatch metadata.
+The agent then starts its avatar and model while the browser is still
+loading, and only waits for the viewer to join before greeting.
+
+WARM_ROOMS_PER_DECK keeps that many such rooms per deck already running
+(from the first viewer of a deck on), so the next viewer is handed a room
+whose avatar is up. Warm rooms
+are deleted after WARM_ROOM_MAX_AGE seconds unused, since a started avatar
+is billed whether anyone watches or not.
+
+LiveKit's server API is async; calls run on a private event loop thread. A
+viewer's request waits for its room (up to ROOM_CREATE_TIMEOUT seconds), so
+a token is only handed out for a room the agent will actually join; warm
+rooms, deletes and pruning never hold up a request.
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from collections import deque
+
+from livekit import api
+
+logger = logging.getLogger('ppt-rooms')
+
+# Explicit dispatch target; empty keeps LiveKit's automatic dispatch
+AGENT_NAME = os.environ.get("AGENT_NAME", "")
+# A pre-created room nobody joins is closed after this many seconds
+ROOM_EMPTY_TIMEOUT = int(os.environ.get("ROOM_EMPTY_TIMEOUT", 300))
+# How long a token request waits for LiveKit to create its room
+ROOM_CREATE_TIMEOUT = float(os.environ.get("ROOM_CREATE_TIMEOUT", 3))
+WARM_ROOMS_PER_DECK = int(os.environ.get("WARM_ROOMS_PER_DECK", 0))
+WARM_ROOM_MAX_AGE = int(os.environ.get("WARM_ROOM_MAX_AGE", 600))
+# Decks that get a warm pool at once, most recently requested first
+WARM_DECKS_MAX = int(os.environ.get("WARM_DECKS_MAX", 8))
+
+_PRUNE_INTERVAL = 30
+
+
+class RoomProvisioner:
+    """Creates rooms with the agent dispatched, and keeps warm rooms per deck."""
+
+    def __init__(self, config, agent_name=AGENT_NAME, warm_per_deck=WARM_ROOMS_PER_DECK):
+        self.config = config
+        self.agent_name = agent_name
+        self.warm_per_deck = warm_per_deck if agent_name else 0
+        self._warm = {}
+        self._lock = threading.RLock()
+        self._client = None
+        self._loop = None
+
+    @property
+    def enabled(self):
+        return bool(self.agent_name) and self.config.complete
+
+    def _start_loop(self):
+        # Caller holds the lock
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name="rooms", daemon=True).start()
+            if self.warm_per_deck:
+                self._loop.call_soon_threadsafe(self._schedule_prune)
+
+    def _submit(self, coro):
+        with self._lock:
+            self._start_loop()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def _api(self):
+        # aiohttp needs the running loop, so the client is made on first use there
+        if self._client is None:
+            self._client = api.LiveKitAPI(self.config.url, self.config.api_key, self.config.api_secret)
+        return self._client
+
+    async def _create(self, room_name, deck_id, empty_timeout):
+        metadata = json.dumps({"deck_id": deck_id})
+        await self._api().room.create_room(api.CreateRoomRequest(
+            name=room_name,
+            empty_timeout=empty_timeout,
+            metadata=metadata,
+            agents=[api.RoomAgentDispatch(agent_name=self.agent_name, metadata=metadata)],
+        ))
+
+    def provision(self, room_name, deck_id, empty_timeout=ROOM_EMPTY_TIMEOUT):
+        """Create room_name with the agent dispatched; returns without waiting."""
+        started = time.perf_counter()
+        future = self._submit(self._create(room_name, deck_id, empty_timeout))
+
+        def done(future):
+            if future.cancelled():
+                logger.warning(f"⌛ Gave up creating {room_name} after {time.perf_counter() - started:.1f}s")
+            elif future.exception():
+                logger.error(f"❌ Could not pre-create {room_name}: {future.exception()}")
+            else:
+                logger.info(f"🏗️ Created {room_name} with agent dispatched "
+                            f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+
+        future.add_done_callback(done)
+        return future
+
+    def create(self, room_name, deck_id, timeout=ROOM_CREATE_TIMEOUT):
+        """Create room_name with the agent dispatched and wait for it.
+
+        Raises on failure or after timeout seconds. A request that timed out
+        may still reach LiveKit and create the room with the agent in it, and
+        nobody holds a token for it, so such a room is deleted once created.
+        """
+        future = self.provision(room_name, deck_id)
+        try:
+            future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.add_done_callback(lambda future: self._discard(room_name, future))
+            raise
+
+    def _discard(self, room_name, future):
+        # Runs on the rooms loop once a timed-out create finishes
+        if future.cancelled() or future.exception() is not None:
+            return
+        with self._lock:
+            loop = self._loop
+        if loop is not None:
+            loop.create_task(self._delete(room_name))
+
+    def dispatch_config(self, deck_id):
+        """Token room configuration that dispatches the agent when the first
+        participant joins, instead of creating the room now."""
+        metadata = json.dumps({"deck_id": deck_id})
+        return api.RoomConfiguration(
+            agents=[api.RoomAgentDispatch(agent_name=self.agent_name, metadata=metadata)],
+        )
+
+    def claim(self, deck_id):
+        """A warm room for deck_id, or None; the pool is topped up either way."""
+        if not self.warm_per_deck:
+            return None
+        room_name = None
+        dropped = []
+        cutoff = time.time() - WARM_ROOM_MAX_AGE
+        with self._lock:
+            pool = self._warm.pop(deck_id, deque())
+            # Oldest first; a room still being created ends the search
+            while pool and room_name is None and pool[0][2].done():
+                created_at, name, future = pool.popleft()
+                if future.exception():
+                    continue
+                if created_at < cutoff:
+                    dropped.append(name)
+                else:
+                    room_name = name
+            self._warm[deck_id] = pool
+            dropped.extend(self._evict_decks())
+        for name in dropped:
+            self._submit(self._delete(name))
+        self._refill(deck_id)
+        if room_name:
+            logger.info(f"🔥 Handing out warm room {room_name} for deck {deck_id}")
+        return room_name
+
+    def _evict_decks(self):
+        # Caller holds the lock; least recently claimed decks lose their pools
+        dropped = []
+        while len(self._warm) > WARM_DECKS_MAX:
+            deck_id = next(iter(self._warm))
+            dropped.extend(name for _, name, _ in self._warm.pop(deck_id))
+        return dropped
+
+    def _refill(self, deck_id):
+        with self._lock:
+            pool = self._warm.setdefault(deck_id, deque())
+            while len(pool) < self.warm_per_deck:
+                name = f"ppt_warm_{os.urandom(4).hex()}"
+                # LiveKit may close it too, a little after it would be dropped here
+                future = self.provision(name, deck_id, empty_timeout=WARM_ROOM_MAX_AGE + _PRUNE_INTERVAL)
+                pool.append((time.time(), name, future))
+
+    async def _delete(self, room_name):
+        try:
+            await self._api().room.delete_room(api.DeleteRoomRequest(room=room_name))
+            logger.info(f"🧹 Deleted unused room {room_name}")
+        except Exception as e:
+            logger.warning(f"Could not delete room {room_name}: {e}")
+
+    def _schedule_prune(self):
+        if self._loop is not None:
+            self._loop.call_later(_PRUNE_INTERVAL, self._prune)
+
+    def _prune(self):
+        # Runs on the rooms loop
+        cutoff = time.time() - WARM_ROOM_MAX_AGE
+        expired = []
+        with self._lock:
+            for deck_id, pool in self._warm.items():
+                while pool and pool[0][0] < cutoff:
+                    expired.append(pool.popleft()[1])
+        for name in expired:
+            asyncio.get_running_loop().create_task(self._delete(name))
+        self._schedule_prune()
+
+    def shutdown(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+            warm = [name for pool in self._warm.values() for _, name, _ in pool]
+            self._warm.clear()
+        if loop is None:
+            return
+        deletes = [asyncio.run_coroutine_threadsafe(self._delete(name), loop) for name in warm]
+        for future in deletes:
+            future.result(timeout=5)
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
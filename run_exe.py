@@ -27,7 +27,7 @@ if os.path.exists(env_path):
 
 # Import Modules
 import server
-from livekit.agents import cli, WorkerOptions
+from livekit.agents import cli
 # Import Agent Module
 from agent import agent as agent_module
 
@@ -41,7 +41,7 @@ def start_agent_process():
     # Important: Set args to 'start' to avoid dev mode watchers
     sys.argv = ["agent", "start"]
     try:
-        cli.run_app(WorkerOptions(entrypoint_fnc=agent_module.entrypoint))
+        cli.run_app(agent_module.worker_options(agent_module.entrypoint, agent_module.prewarm))
     except Exception as e:
         logger.error(f"Agent Crash: {e}")
 
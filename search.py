@@ -0,0 +1,108 @@
+"""Offline BM25 search over slide text.
+
+Built once per deck at upload time and saved next to it as search.npz:
+a vocabulary plus a slides x terms float32 matrix of precomputed BM25
+weights. Scoring a question is then a column lookup and a row sum, so the
+agent can ground Q&A answers in a few slides instead of keeping the whole
+deck in its prompt.
+"""
+import os
+import re
+import unicodedata
+
+import numpy as np
+
+SEARCH_K1 = float(os.environ.get("SEARCH_K1", 1.5))
+SEARCH_B = float(os.environ.get("SEARCH_B", 0.75))
+
+_ASCII_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("""
+    a an and are as at be but by can do does for from has have how i in is it
+    its me of on or so that the their there this to was we what when where
+    which who why will with you your
+""".split())
+
+
+def _words(text):
+    if text.isascii():
+        return _ASCII_TOKEN_RE.findall(text)
+    # Letters and digits in any script, plus combining marks: Devanagari vowel
+    # signs and viramas are marks, and \w alone would split words at them
+    words, word = [], []
+    for char in unicodedata.normalize("NFC", text):
+        if char.isalnum() or unicodedata.category(char).startswith("M"):
+            word.append(char)
+        elif word:
+            words.append("".join(word))
+            word = []
+    if word:
+        words.append("".join(word))
+    return words
+
+
+def tokenize(text):
+    return [token for token in _words(text.lower()) if token not in _STOPWORDS]
+
+
+def slide_text(slide):
+    """Everything searchable on a slide; the title counts twice."""
+    if "bullets" not in slide:
+        return slide.get("content", "")
+    parts = [slide.get("title", "")] * 2
+    parts.extend(slide["bullets"])
+    for table in slide.get("tables", []):
+        parts.extend(cell for row in table for cell in row)
+    parts.append(slide.get("notes", ""))
+    return " ".join(parts)
+
+
+class SlideIndex:
+    """BM25 weights for one deck."""
+
+    def __init__(self, vocabulary, weights, slide_numbers):
+        self.vocabulary = {term: col for col, term in enumerate(vocabulary)}
+        self.weights = weights
+        self.slide_numbers = slide_numbers
+
+    @classmethod
+    def build(cls, slides, k1=SEARCH_K1, b=SEARCH_B):
+        docs = [tokenize(slide_text(slide)) for slide in slides]
+        vocabulary = sorted({term for doc in docs for term in doc})
+        columns = {term: col for col, term in enumerate(vocabulary)}
+
+        counts = np.zeros((len(docs), len(vocabulary)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            for term in doc:
+                counts[row, columns[term]] += 1
+
+        lengths = counts.sum(axis=1, keepdims=True)
+        avg_length = max(float(lengths.mean()), 1.0) if len(docs) else 1.0
+        doc_freq = (counts > 0).sum(axis=0)
+        idf = np.log1p((len(docs) - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        norm = k1 * (1 - b + b * lengths / avg_length)
+        weights = idf * counts * (k1 + 1) / (counts + norm)
+
+        slide_numbers = np.array([slide["slide_number"] for slide in slides], dtype=np.int32)
+        return cls(vocabulary, weights.astype(np.float32), slide_numbers)
+
+    def search(self, query, limit=3):
+        """[(slide_number, score)] best first; slides with no matching term are left out."""
+        columns = [self.vocabulary[term] for term in set(tokenize(query)) if term in self.vocabulary]
+        if not columns or not len(self.slide_numbers):
+            return []
+        scores = self.weights[:, columns].sum(axis=1)
+        best = np.argsort(-scores, kind="stable")[:limit]
+        return [(int(self.slide_numbers[i]), float(scores[i])) for i in best if scores[i] > 0]
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path,
+                 vocabulary=np.array(sorted(self.vocabulary, key=self.vocabulary.get), dtype=str),
+                 weights=self.weights,
+                 slide_numbers=self.slide_numbers)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["vocabulary"].tolist(), data["weights"], data["slide_numbers"])
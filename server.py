@@ -1,15 +1,34 @@
 import os
+import re
+import sys
+import math
+import time
 import logging
-import json
-import subprocess
+import atexit
+import shutil
+import hashlib
+import tempfile
 import threading
-from flask import Flask, jsonify, request, send_from_directory
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, abort, jsonify, request, send_from_directory
 from flask_cors import CORS
 from dotenv import load_dotenv
-from livekit import api
-from werkzeug.utils import secure_filename
-from pptx import Presentation
-from pdf2image import convert_from_path
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+import deckstore
+from jobs import JobManager, CONVERSION_WORKERS, sse_message
+from office import ConverterPool, ConversionError
+from rasterize import rasterize_pdf, RASTER_DPI, RASTER_JPEG_QUALITY
+from extract import extract_slides, flatten
+from search import SlideIndex
+from connections import ConnectionService, ConnectionDetailsError, LiveKitConfig
+from rooms import RoomProvisioner
+from uploads import (UploadStore, UploadError, MAX_UPLOAD_BYTES, UPLOAD_CHUNK_BYTES,
+                     check_package, copy_stream, validate_filename)
+from renditions import make_renditions, negotiate, RENDITION_WIDTHS, RENDITION_FORMATS, RENDITION_QUALITY
+import metrics
+from metrics import timed
+from profiler import SamplingProfiler, PROFILER_ENABLED
 
 load_dotenv()
 
@@ -17,90 +36,195 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('ppt-server')
 
 app = Flask(__name__, static_folder='.', static_url_path='')
+# Behind a load balancer, rate limits must see the client address, not the proxy's
+PROXY_HOPS = int(os.environ.get("PROXY_HOPS", 0))
+if PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_HOPS, x_proto=PROXY_HOPS)
 CORS(app)
+metrics.instrument(app)
+profiler = SamplingProfiler() if PROFILER_ENABLED else None
+
+# "waitress" (threaded WSGI) or "asgi" (event loop, see asgi.py)
+SERVER_MODE = os.environ.get("SERVER_MODE", "waitress").lower()
+WAITRESS_THREADS = int(os.environ.get("WAITRESS_THREADS", 4))
+# A waitress thread serves a job event stream at most this long; the browser
+# then reconnects (after SSE_RETRY_MS) and resumes from the last event id.
+# The ASGI server keeps streams open without a thread and ignores the limit.
+SSE_HOLD_SECONDS = float(os.environ.get("SSE_HOLD_SECONDS", 25))
+SSE_RETRY_MS = int(os.environ.get("SSE_RETRY_MS", 1000))
+# Each waitress stream pins a thread, so only this many run at once; past
+# that the stream is refused with 503 and the browser polls the job instead.
+SSE_MAX_STREAMS = int(os.environ.get("SSE_MAX_STREAMS", WAITRESS_THREADS // 4))
+sse_slots = threading.BoundedSemaphore(max(1, SSE_MAX_STREAMS))
 
 # Folders for storage
 UPLOAD_FOLDER = 'uploads'
-SLIDES_FOLDER = 'slides'  
+SLIDES_FOLDER = 'slides'  # Legacy single-deck output, still served as a fallback
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(SLIDES_FOLDER, exist_ok=True)
+os.makedirs(deckstore.DECKS_FOLDER, exist_ok=True)
+
+# Multipart uploads are refused past the limit (plus room for the form framing)
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES + 1024 * 1024
+upload_store = UploadStore(os.path.join(UPLOAD_FOLDER, 'partial'))
+
+# Versioned (?v=) deck slide URLs are immutable, so browsers may keep them for a year
+SLIDE_CACHE_MAX_AGE = 365 * 24 * 3600
+# What /slides/<deck>/ serves: Slide{n}.jpg and its renditions (Slide{n}.thumb.webp)
+_SLIDE_FILE_RE = re.compile(r"^Slide\d+(\.[a-z0-9]+)?\.(jpg|webp|avif)$")
+
+# Render settings are part of the deck id, so changing them re-renders
+RENDER_SETTINGS = {
+    "version": 6,
+    "dpi": RASTER_DPI,
+    "quality": RASTER_JPEG_QUALITY,
+    "renditions": RENDITION_WIDTHS,
+    "formats": RENDITION_FORMATS,
+    "rendition_quality": RENDITION_QUALITY,
+}
+
+# Conversions run here instead of on waitress request threads
+job_manager = JobManager()
+deck_cache = deckstore.DeckCache()
+# Text extraction overlaps with the PDF/raster work of the same job
+text_executor = ThreadPoolExecutor(max_workers=CONVERSION_WORKERS, thread_name_prefix="extract")
+# Warm LibreOffice instances, started on the first upload
+office_pool = ConverterPool()
+atexit.register(office_pool.shutdown)
+# LiveKit config is read once here, not per request
+livekit_config = LiveKitConfig.from_env()
+# With AGENT_NAME set, rooms are created and the agent dispatched at mint time
+room_provisioner = RoomProvisioner(livekit_config)
+atexit.register(room_provisioner.shutdown)
+connection_service = ConnectionService(livekit_config, rooms=room_provisioner)
+
+def _report(progress, stage, done, total, slide=None):
+    if progress and slide:
+        progress(stage, done, total, slide=slide)
+    elif progress:
+        progress(stage, done, total)
+
+def slide_event(deck_id, slide_number, version=None):
+    return {"slide_number": slide_number, "image_url": deckstore.slide_url(deck_id, slide_number, version)}
+
+def extract_text(ppt_path, deck_id, build, progress=None):
+    """Publish presentation.json for the agent; runs alongside rendering."""
+    with timed("text"):
+        records = extract_slides(ppt_path, on_slide=lambda done, total: _report(progress, "text", done, total))
+    slides_data = [
+        {
+            "slide_number": record["slide_number"],
+            "image_url": deckstore.slide_url(deck_id, record["slide_number"]),
+            "content": flatten(record),
+            **{key: value for key, value in record.items() if key != "slide_number"},
+        }
+        for record in records
+    ]
+    deckstore.write_presentation(deck_id, slides_data)
+    SlideIndex.build(slides_data).save(deckstore.search_index_path(deck_id))
+    build.set_slide_count(len(slides_data))
+    return slides_data
+
+def process_ppt(ppt_path, deck_id, progress=None):
+    """Convert a deck into decks/<deck_id>/. progress(stage, done, total) is optional;
+    when a slide image is published it also gets slide={"slide_number", "image_url"}.
+
+    Slide text is extracted on a separate thread while LibreOffice and the
+    rasterizer run, and each image is published as soon as it is rendered
+    (see deckstore.DeckBuild), so a session can start before the deck is done.
+    """
+    build = text_future = None
 
-def process_ppt(ppt_path):
-    slides_data = []
-    
     try:
         abs_ppt_path = os.path.abspath(ppt_path)
-        abs_slides_folder = os.path.abspath(SLIDES_FOLDER)
+        abs_slides_folder = deckstore.deck_dir(deck_id)
         
-        # 1. Clear old slides
-        for f in os.listdir(abs_slides_folder):
-            file_path = os.path.join(abs_slides_folder, f)
-            if os.path.isfile(file_path):
-                os.remove(file_path)
+        # 1. Start from an empty workspace (leftovers of a failed run)
+        shutil.rmtree(abs_slides_folder, ignore_errors=True)
+        os.makedirs(abs_slides_folder)
+        build = deckstore.DeckBuild(deck_id)
+
+        # 2. Extract Text (Platform Independent) in parallel with rendering
+        text_future = text_executor.submit(extract_text, ppt_path, deck_id, build, progress)
 
         print(f"⏳ Converting PPT to PDF (Linux Mode)...")
+        _report(progress, "pdf", 0, 1)
         
-        # Use LibreOffice to convert PPTX -> PDF
+        # Use the pooled LibreOffice instances to convert PPTX -> PDF
         # This works on AWS/Linux without a GUI
-        cmd = [
-            "libreoffice", "--headless", "--invisible", "--nodefault", "--nofirststartwizard",
-            "--convert-to", "pdf",
-            "--outdir", abs_slides_folder,
-            abs_ppt_path
-        ]
-        
-        subprocess.run(cmd, check=True)
-        
-        # Get the generated PDF path
-        base_name = os.path.splitext(os.path.basename(ppt_path))[0]
-        pdf_path = os.path.join(abs_slides_folder, f"{base_name}.pdf")
+        try:
+            with timed("office"):
+                pdf_path = office_pool.convert(abs_ppt_path, abs_slides_folder)
+        except ConversionError as e:
+            logger.error(f"❌ {e}")
+            pdf_path = None
+        _report(progress, "pdf", 1, 1)
 
-        # 2. Convert PDF -> Images (JPG)
+        # 3. Convert PDF -> Images (JPG)
         print(f"📸 Extracting images from PDF...")
-        if os.path.exists(pdf_path):
-            images = convert_from_path(pdf_path)
-            for i, image in enumerate(images, start=1):
-                image_filename = f"Slide{i}.jpg"
-                save_path = os.path.join(abs_slides_folder, image_filename)
-                image.save(save_path, "JPEG")
-                print(f"   -> Saved {image_filename}")
+        if pdf_path and os.path.exists(pdf_path):
+            # Pages land out of order from parallel batches; count completions
+            rendered = {"done": 0, "total": 0}
+            lock = threading.Lock()
+            def on_start(page_count):
+                rendered["total"] = page_count
+                _report(progress, "rasterize", 0, page_count)
+
+            def on_page(page_number, path):
+                with timed("renditions"):
+                    renditions = make_renditions(path, page_number)
+                version = deckstore.file_etag(path)[:12]
+                build.mark_ready(page_number, renditions, version=version)
+                with lock:
+                    rendered["done"] += 1
+                    _report(progress, "rasterize", rendered["done"], rendered["total"],
+                            slide=slide_event(deck_id, page_number, version))
+                print(f"   -> Saved {os.path.basename(path)}")
+
+            with timed("rasterize"):
+                rasterize_pdf(pdf_path, abs_slides_folder, on_start=on_start, on_page=on_page)
+            os.remove(pdf_path)
         else:
             print("❌ PDF conversion failed. Please check LibreOffice installation.")
+            _settle_text(text_future)
+            build.fail()
             return []
 
-        # 3. Extract Text (Platform Independent)
-        prs = Presentation(ppt_path)
-        for i, slide in enumerate(prs.slides, start=1):
-            slide_text = []
-            if slide.shapes.title and slide.shapes.title.text:
-                slide_text.append(f"Title: {slide.shapes.title.text}")
-            for shape in slide.shapes:
-                if shape.has_text_frame and shape != slide.shapes.title:
-                    text = shape.text.strip()
-                    if text:
-                        slide_text.append(text)
-            
-            # Verify image exists
-            img_url = f"/slides/Slide{i}.jpg"
-            if not os.path.exists(os.path.join(SLIDES_FOLDER, f"Slide{i}.jpg")):
-                 logger.warning(f"Image for slide {i} missing")
-
-            slides_data.append({
-                "slide_number": i,
-                "image_url": img_url, 
-                "content": " ".join(slide_text)
-            })
-
-        # Save data for Agent
-        with open("presentation.json", "w", encoding="utf-8") as f:
-            json.dump(slides_data, f, indent=4, ensure_ascii=False)
+        slides_data = text_future.result()
+        if len(slides_data) != len(build.ready):
+            logger.warning(f"PDF has {len(build.ready)} pages for {len(slides_data)} slides")
 
+        # Record each slide's content-hashed URL and rendition set
+        with timed("save"):
+            for slide in slides_data:
+                number = slide["slide_number"]
+                slide["image_url"] = deckstore.slide_url(deck_id, number, build.versions.get(number))
+                renditions = build.renditions.get(number, {})
+                slide["renditions"] = {
+                    size: {key: deckstore.file_url(deck_id, value) if key in RENDITION_FORMATS else value
+                           for key, value in entry.items()}
+                    for size, entry in renditions.items()
+                }
+            deckstore.write_presentation(deck_id, slides_data)
+            build.finish()
         return slides_data
 
     except Exception as e:
         logger.error(f"❌ Error processing PPT: {e}")
+        if build:
+            _settle_text(text_future)
+            build.fail()
         return []
 
+def _settle_text(text_future):
+    """Stop or wait out text extraction so it cannot publish after a failure."""
+    if text_future is None or text_future.cancel():
+        return
+    try:
+        text_future.result()
+    except Exception:
+        pass
+
 # --- ROUTES ---
 
 @app.route('/')
@@ -109,75 +233,270 @@ def index():
 
 @app.route('/slides/<path:filename>')
 def serve_slide(filename):
-    return send_from_directory(SLIDES_FOLDER, filename)
+    deck_id, _, name = filename.partition('/')
+    if deckstore.is_deck_id(deck_id) and name:
+        # Only slide images; manifest.json, presentation.json (speaker notes)
+        # and the search index stay private to the server and the agent
+        if not _SLIDE_FILE_RE.match(name):
+            abort(404)
+        # Slide{n}.jpg?w=<px>|size=thumb|screen|full picks a rendition
+        folder = deckstore.deck_dir(deck_id)
+        name = negotiate(
+            folder, name,
+            request.headers.get('Accept'),
+            width=request.args.get('w', type=int),
+            size=request.args.get('size'),
+        )
+        try:
+            etag = deckstore.file_etag(os.path.join(folder, name))
+        except OSError:
+            abort(404)
+        response = send_from_directory(folder, name, etag=etag, conditional=True)
+        response.vary.add('Accept')
+        response.cache_control.public = True
+        if request.args.get('v'):
+            # ?v= is the slide's content version, so these bytes never change
+            response.cache_control.no_cache = None
+            response.cache_control.max_age = SLIDE_CACHE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            # A slide is re-rendered in place while its deck builds: revalidate
+            response.cache_control.no_cache = True
+        return response
+
+    # Legacy slides/ gets overwritten in place: revalidate every time
+    response = send_from_directory(SLIDES_FOLDER, filename, conditional=True)
+    response.cache_control.no_cache = True
+    return response
+
+@app.errorhandler(UploadError)
+def upload_error(e):
+    return jsonify({"error": str(e), **e.details}), e.status
+
+def start_conversion(tmp_path, file_hash):
+    """Hand a fully received upload to the cache or the conversion pool."""
+    deck_id = deckstore.deck_key(file_hash, RENDER_SETTINGS)
+
+    # Same bytes + same settings: reuse the finished deck
+    cached = deck_cache.lookup(deck_id)
+    if cached is not None:
+        os.remove(tmp_path)
+        job = job_manager.complete(
+            {"deck_id": deck_id, "slide_count": len(cached), "cached": True},
+            slides=[{"slide_number": slide["slide_number"], "image_url": slide["image_url"]} for slide in cached],
+        )
+        return jsonify({
+            "status": "done",
+            "job_id": job.id,
+            "deck_id": deck_id,
+            "status_url": f"/api/jobs/{job.id}",
+            "events_url": f"/api/jobs/{job.id}/events",
+        })
+
+    # Store under the content hash so identical names never collide
+    filepath = os.path.join(UPLOAD_FOLDER, f"{file_hash}.pptx")
+    os.replace(tmp_path, filepath)
+
+    # Convert on the worker pool; the client polls /api/jobs/<id>
+    job = job_manager.submit(run_conversion, filepath, deck_id, key=deck_id)
+    return jsonify({
+        "status": "queued",
+        "job_id": job.id,
+        "deck_id": deck_id,
+        "status_url": f"/api/jobs/{job.id}",
+        "events_url": f"/api/jobs/{job.id}/events",
+    }), 202
 
 @app.route('/api/upload-ppt', methods=['POST'])
 def upload_ppt():
+    """Single-request upload; /api/uploads is the resumable variant."""
     if 'file' not in request.files:
         return jsonify({"error": "No file part"}), 400
     file = request.files['file']
-    if file.filename == '':
-        return jsonify({"error": "No selected file"}), 400
-    
-    if file and file.filename.endswith('.pptx'):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
-        
-        # Process in a thread to avoid blocking response
-        def run_processing():
-            process_ppt(filepath)
-
-        thread = threading.Thread(target=run_processing)
-        thread.start()
-        thread.join() # Wait for simple implementation
-
-        if os.path.exists("presentation.json"):
-            with open("presentation.json", "r") as f:
-                data = json.load(f)
-            return jsonify({"status": "success", "slide_count": len(data)})
-        else:
-             return jsonify({"error": "Processing failed"}), 500
-    
-    return jsonify({"error": "Invalid file type"}), 400
+    validate_filename(file.filename)
 
-@app.route('/api/connection-details')
-def connection_details():
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_FOLDER, suffix='.pptx')
+    hasher = hashlib.sha256()
     try:
-        LIVEKIT_URL = os.getenv('LIVEKIT_URL')
-        API_KEY = os.getenv('LIVEKIT_API_KEY')
-        API_SECRET = os.getenv('LIVEKIT_API_SECRET')
+        with os.fdopen(fd, 'wb') as out:
+            copy_stream(file.stream, out, hasher, MAX_UPLOAD_BYTES, validate_head=True)
+        check_package(tmp_path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return start_conversion(tmp_path, hasher.hexdigest())
 
-        if not all([LIVEKIT_URL, API_KEY, API_SECRET]):
-            return jsonify({"error": "Missing Keys"}), 500
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    body = request.get_json(silent=True) or {}
+    upload = upload_store.create(body.get('filename'), body.get('size'))
+    return jsonify({
+        **upload.to_dict(),
+        "chunk_size": UPLOAD_CHUNK_BYTES,
+        "upload_url": f"/api/uploads/{upload.id}",
+    }), 201
 
-        room_name = f"ppt_session_{os.urandom(4).hex()}"
-        participant_identity = f"user_{os.urandom(4).hex()}"
-        
-        token = api.AccessToken(API_KEY, API_SECRET) \
-            .with_identity(participant_identity) \
-            .with_name("User") \
-            .with_grants(api.VideoGrants(
-                room_join=True,
-                room=room_name,
-                can_publish=True,
-                can_subscribe=True,
-            )).to_jwt()
+@app.route('/api/uploads/<upload_id>', methods=['GET', 'PUT', 'DELETE'])
+def upload_chunk(upload_id):
+    if request.method == 'GET':
+        return jsonify(upload_store.get(upload_id).to_dict())
+    if request.method == 'DELETE':
+        upload_store.discard(upload_id)
+        return '', 204
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        raise UploadError("offset query parameter is required")
+    # Read the raw body as it arrives; never via request.data
+    upload = upload_store.append(upload_id, offset, request.stream)
+    return jsonify(upload.to_dict())
 
-        return jsonify({
-            "serverUrl": LIVEKIT_URL,
-            "roomName": room_name,
-            "participantToken": token
-        })
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+@app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    tmp_path, file_hash = upload_store.complete(upload_id)
+    return start_conversion(tmp_path, file_hash)
+
+def run_conversion(filepath, deck_id, progress=None):
+    # A job for the same deck may have finished while this one was queued
+    if deckstore.deck_ready(deck_id):
+        slides_data = deckstore.load_presentation(deck_id)
+    else:
+        with timed("total"):
+            slides_data = process_ppt(filepath, deck_id, progress=progress)
+    if os.path.exists(filepath):
+        os.remove(filepath)
+    metrics.CONVERSION_JOBS.labels("ok" if slides_data else "failed").inc()
+    if not slides_data:
+        return None
+
+    deck_cache.touch(deck_id)
+    deck_cache.evict(keep=job_manager.inflight_keys() | {deck_id})
+    return {"deck_id": deck_id, "slide_count": len(slides_data), "cached": False}
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    return jsonify({**deck_cache.stats(), "converters": office_pool.status()})
+
+@app.route('/api/profiler', methods=['GET', 'POST', 'DELETE'])
+def profiler_control():
+    """POST starts sampling, DELETE stops it, GET returns the collapsed stacks."""
+    if profiler is None:
+        abort(404)
+    if request.method == 'POST':
+        started = profiler.start()
+        return jsonify(profiler.status()), 201 if started else 409
+    if request.method == 'DELETE':
+        profiler.stop()
+        return jsonify(profiler.status())
+    if request.args.get('format') == 'json':
+        return jsonify(profiler.status())
+    return profiler.collapsed(), 200, {"Content-Type": "text/plain; charset=utf-8"}
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    status = job.to_dict()
+    # Which slides can already be shown while the rest converts
+    if deckstore.is_deck_id(job.key):
+        status["deck"] = deckstore.load_manifest(job.key)
+    return jsonify(status)
+
+def last_event_id():
+    """Where a (re)connecting event stream resumes: Last-Event-ID or ?after=."""
+    value = request.headers.get('Last-Event-ID') or request.args.get('after') or 0
+    try:
+        return max(0, int(value))
+    except ValueError:
+        return 0
+
+@app.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-sent events for a job: progress, slide (as each one is published)
+    and status. The stream ends once the job has settled."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if SSE_MAX_STREAMS <= 0 or not sse_slots.acquire(blocking=False):
+        response = jsonify({"error": "Too many event streams, poll the job instead"})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    seq = last_event_id()
+
+    def stream():
+        nonlocal seq
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        deadline = time.monotonic() + SSE_HOLD_SECONDS
+        while True:
+            events = job.wait_events(seq, timeout=max(0.0, deadline - time.monotonic()))
+            for event in events:
+                seq = event["seq"]
+                yield sse_message(event)
+            if job.finished and seq == len(job.events):
+                return
+            if time.monotonic() >= deadline:
+                return
+
+    response = Response(stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # The server closes the body however the stream ends, even unstarted
+    response.call_on_close(sse_slots.release)
+    return response
+
+@app.errorhandler(ConnectionDetailsError)
+def connection_details_error(e):
+    response = jsonify({"error": str(e)})
+    response.status_code = e.status
+    if e.retry_after:
+        response.headers['Retry-After'] = str(math.ceil(e.retry_after))
+        metrics.CONNECTION_TOKENS.labels("rate_limited").inc()
+    return response
+
+def bind_deck(deck_id):
+    """Sessions are bound to a converted deck so the agent presents the right one."""
+    if not deck_id:
+        return None
+    if not deckstore.deck_exists(deck_id):
+        raise ConnectionDetailsError("Unknown deck", 404)
+    deck_cache.touch(deck_id)
+    return deck_id
+
+@app.route('/api/connection-details')
+def connection_details():
+    deck_id = bind_deck(request.args.get('deck_id'))
+    # A per-tab id lets a reload within TOKEN_REUSE_SECONDS get the same room back
+    client_id = request.headers.get('X-Client-Id') or request.args.get('client_id')
+    details, reused = connection_service.issue(deck_id, request.remote_addr, client_id)
+    metrics.CONNECTION_TOKENS.labels("reused" if reused else "minted").inc()
+    return jsonify(details)
+
+@app.route('/api/connection-details/bulk', methods=['POST'])
+def connection_details_bulk():
+    """Pre-provision rooms for an event: {"count", "deck_id", "prefix"}, BULK_API_KEY as bearer."""
+    body = request.get_json(silent=True) or {}
+    deck_id = bind_deck(body.get('deck_id'))
+    api_key = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    rooms = connection_service.bulk(body.get('count'), deck_id, request.remote_addr, api_key,
+                                    prefix=body.get('prefix') or "ppt_event")
+    metrics.CONNECTION_TOKENS.labels("minted").inc(len(rooms))
+    return jsonify({"serverUrl": connection_service.config.url, "deckId": deck_id, "rooms": rooms}), 201
 
 def start_server():
-    from waitress import serve
     # AWS/Docker will provide the PORT env var
     port = int(os.environ.get("PORT", 8000))
+    if SERVER_MODE == "asgi":
+        import asgi
+        print(f"🟢 Web Server (ASGI) running on 0.0.0.0:{port}")
+        # This module runs as __main__; asgi must not import a second copy
+        asgi.run(sys.modules[__name__], host='0.0.0.0', port=port)
+        return
+
+    from waitress import create_server
+    server = create_server(app, host='0.0.0.0', port=port, threads=WAITRESS_THREADS)
+    metrics.watch_waitress(server, WAITRESS_THREADS)
     print(f"🟢 Web Server running on 0.0.0.0:{port}")
-    serve(app, host='0.0.0.0', port=port, threads=4)
+    server.run()
 
 if __name__ == '__main__':
     start_server()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The app's modules live at the repository root and in agent/, not in packages
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(1, os.path.join(ROOT, "agent"))
@@ -0,0 +1,88 @@
+import pytest
+
+import connections
+from connections import BULK_MAX_ROOMS, ConnectionDetailsError, ConnectionService, LiveKitConfig, RateLimiter
+
+SECRET = "a-test-secret-long-enough-for-hs256"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(connections.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def service():
+    return ConnectionService(config=LiveKitConfig("wss://livekit.test", "key", SECRET, "bulk-key"))
+
+
+def test_burst_then_exhausted(clock):
+    limiter = RateLimiter(per_minute=60, burst=3)
+    assert [limiter.acquire("1.2.3.4") for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("1.2.3.4") == pytest.approx(1.0)
+    # Other clients have their own bucket
+    assert limiter.acquire("5.6.7.8") == 0
+
+
+def test_bucket_refills_over_time(clock):
+    limiter = RateLimiter(per_minute=60, burst=2)
+    limiter.acquire("1.2.3.4", cost=2)
+    clock.now += 0.5
+    assert limiter.acquire("1.2.3.4") == pytest.approx(0.5)
+    clock.now += 0.5
+    assert limiter.acquire("1.2.3.4") == 0
+    # Never refills past the burst
+    clock.now += 600
+    assert limiter.acquire("1.2.3.4", cost=2) == 0
+    assert limiter.acquire("1.2.3.4") > 0
+
+
+def test_cost_larger_than_what_is_left(clock):
+    limiter = RateLimiter(per_minute=60, burst=5)
+    limiter.acquire("1.2.3.4", cost=4)
+    assert limiter.acquire("1.2.3.4", cost=3) == pytest.approx(2.0)
+    # A refused request takes nothing
+    assert limiter.acquire("1.2.3.4") == 0
+
+
+def test_zero_rate_disables_limiting(clock):
+    limiter = RateLimiter(per_minute=0, burst=1)
+    assert all(limiter.acquire("1.2.3.4") == 0 for _ in range(100))
+
+
+def test_bulk_provisions_count_rooms(service):
+    rooms = service.bulk(3, None, "1.2.3.4", "bulk-key", prefix="talk")
+    assert len(rooms) == 3
+    assert len({room["roomName"] for room in rooms}) == 3
+    assert all(room["roomName"].startswith("talk_") for room in rooms)
+
+
+@pytest.mark.parametrize("count", [0, -1, BULK_MAX_ROOMS + 1, "5", 2.0, None])
+def test_bulk_count_limits(service, count):
+    with pytest.raises(ConnectionDetailsError) as excinfo:
+        service.bulk(count, None, "1.2.3.4", "bulk-key")
+    assert excinfo.value.status == 400
+
+
+@pytest.mark.parametrize("api_key", [None, "", "wrong"])
+def test_bulk_needs_the_key(service, api_key):
+    with pytest.raises(ConnectionDetailsError) as excinfo:
+        service.bulk(1, None, "1.2.3.4", api_key)
+    assert excinfo.value.status == 403
+
+
+def test_bulk_disabled_without_a_configured_key():
+    service = ConnectionService(config=LiveKitConfig("wss://livekit.test", "key", SECRET))
+    with pytest.raises(ConnectionDetailsError) as excinfo:
+        service.bulk(1, None, "1.2.3.4", "")
+    assert excinfo.value.status == 403
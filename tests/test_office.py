@@ -0,0 +1,137 @@
+import os
+import time
+import threading
+
+import pytest
+from pptx import Presentation
+
+from office import ConverterPool, ConversionError, FakeConverter
+
+
+@pytest.fixture
+def deck(tmp_path):
+    prs = Presentation()
+    for _ in range(2):
+        prs.slides.add_slide(prs.slide_layouts[6])
+    path = tmp_path / "deck.pptx"
+    prs.save(path)
+    return str(path)
+
+
+class FlakyConverter(FakeConverter):
+    """FakeConverter whose health and speed the test controls."""
+
+    def __init__(self, index=0, delay=0):
+        super().__init__(index, delay=delay)
+        self.ok = True
+        self.starts = 0
+        self.timeouts = []
+
+    def start(self):
+        super().start()
+        self.ok = True
+        self.starts += 1
+
+    def healthy(self):
+        return self.ok
+
+    def convert(self, src, outdir, timeout=None):
+        self.timeouts.append(timeout)
+        if self.delay > timeout:
+            # What SofficeConverter's watchdog does to a hung instance
+            time.sleep(timeout)
+            self.ok = False
+            raise ConversionError(f"converter #{self.index} timed out")
+        return super().convert(src, outdir, timeout)
+
+
+def test_converts_to_pdf(deck, tmp_path):
+    pool = ConverterPool(size=1, factory=FakeConverter)
+    pdf_path = pool.convert(deck, str(tmp_path))
+    assert pdf_path == str(tmp_path / "deck.pdf")
+    assert os.path.getsize(pdf_path) > 0
+
+
+def test_uploads_queue_for_a_busy_converter(deck, tmp_path):
+    pool = ConverterPool(size=1, factory=lambda index: FakeConverter(index, delay=0.3))
+    finished = []
+
+    def convert(name):
+        outdir = tmp_path / name
+        outdir.mkdir()
+        pool.convert(deck, str(outdir))
+        finished.append(time.monotonic())
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=convert, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # One converter: the second upload waited for the first to finish
+    assert sorted(finished)[1] - started >= 0.6
+    assert pool.status()["idle"] == 1
+
+
+def test_queue_timeout_when_every_converter_is_busy(deck, tmp_path):
+    pool = ConverterPool(size=1, factory=lambda index: FakeConverter(index, delay=0.5), queue_timeout=0.1)
+    (tmp_path / "a").mkdir()
+    busy = threading.Thread(target=pool.convert, args=(deck, str(tmp_path / "a")))
+    busy.start()
+    time.sleep(0.1)
+    with pytest.raises(ConversionError, match="busy"):
+        pool.convert(deck, str(tmp_path))
+    busy.join()
+
+
+def test_unhealthy_converter_is_restarted_before_use(deck, tmp_path):
+    pool = ConverterPool(size=1, factory=FlakyConverter)
+    pool.start()
+    converter = pool._converters[0]
+    converter.ok = False
+
+    pool.convert(deck, str(tmp_path))
+
+    assert converter.starts == 2
+    assert pool.restarts == 1
+
+
+def test_hung_conversion_times_out_and_restarts(deck, tmp_path):
+    pool = ConverterPool(size=1, factory=lambda index: FlakyConverter(index, delay=5), timeout=0.1)
+
+    with pytest.raises(ConversionError, match="timed out"):
+        pool.convert(deck, str(tmp_path))
+
+    converter = pool._converters[0]
+    assert converter.timeouts == [0.1]
+    assert pool.restarts == 1
+    assert converter.starts == 2
+    # Back in the pool for the next upload
+    assert pool.status()["idle"] == 1
+
+
+def test_bad_file_does_not_restart(tmp_path):
+    pool = ConverterPool(size=1, factory=FlakyConverter)
+    bad = tmp_path / "bad.pptx"
+    bad.write_bytes(b"not a presentation")
+
+    with pytest.raises(Exception):
+        pool.convert(str(bad), str(tmp_path))
+
+    assert pool.restarts == 0
+
+
+def test_status_counts_only_started_converters():
+    pool = ConverterPool(size=2, factory=FakeConverter)
+    assert pool.status() == {
+        "mode": "fake", "size": 2, "started": False, "idle": 0,
+        "running": 0, "healthy": 0, "restarts": 0,
+    }
+
+    pool.start()
+    status = pool.status()
+    assert (status["started"], status["running"], status["healthy"], status["idle"]) == (True, 2, 2, 2)
+
+    pool.shutdown()
+    assert pool.status()["running"] == 0
@@ -0,0 +1,67 @@
+import asyncio
+
+from agent.agent import PresenterState
+
+
+def test_refuses_slides_outside_the_deck():
+    state = PresenterState(slide_count=5, debounce=0)
+    assert state.refuse(0)
+    assert state.refuse(6)
+    assert state.refuse(5) is None
+
+
+def test_unknown_slide_count_allows_any_slide():
+    state = PresenterState(slide_count=0, debounce=0)
+    assert state.refuse(0)
+    assert state.refuse(40) is None
+
+
+def test_refuses_current_and_pending_slides():
+    state = PresenterState(slide_count=5, debounce=0)
+    state.moved_to(2)
+    assert "already on screen" in state.refuse(2)
+    state.pending = 3
+    assert "Already switching" in state.refuse(3)
+    assert "Still switching to slide 3" in state.refuse(4)
+    state.pending = None
+    assert state.refuse(4) is None
+
+
+def test_debounce_after_a_change():
+    state = PresenterState(slide_count=5, debounce=60)
+    assert state.refuse(2) is None
+    state.moved_to(2)
+    assert "just now" in state.refuse(3)
+    state.changed_at -= 60
+    assert state.refuse(3) is None
+
+
+def test_history_keeps_previous_slides():
+    state = PresenterState(slide_count=5, debounce=0)
+    for slide_number in (1, 3, 2):
+        state.moved_to(slide_number)
+    assert state.current == 2
+    assert state.history == [1, 3]
+
+
+def test_ack_resolves_that_change_and_older_ones():
+    # next_change needs a running loop
+    async def acks():
+        state = PresenterState(slide_count=5)
+        changes = [state.next_change() for _ in range(3)]
+        assert [seq for seq, _ in changes] == [1, 2, 3]
+        state.acknowledge(2)
+        return [acked.done() for _, acked in changes]
+
+    assert asyncio.run(acks()) == [True, True, False]
+
+
+def test_forgotten_change_is_not_resolved():
+    async def forget():
+        state = PresenterState(slide_count=5)
+        seq, acked = state.next_change()
+        state.forget(seq)
+        state.acknowledge(seq)
+        return acked.done()
+
+    assert not asyncio.run(forget())
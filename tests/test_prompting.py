@@ -0,0 +1,30 @@
+import pytest
+
+from prompting import build_source_material, estimate_tokens
+
+
+def make_slides(count):
+    return [{"slide_number": n, "title": f"Quarterly revenue by region, part {n}", "bullets": ["x" * 200]}
+            for n in range(1, count + 1)]
+
+
+def test_small_deck_is_included_in_full():
+    text, complete = build_source_material(make_slides(3), budget=1500)
+    assert complete
+    assert "- " + "x" * 200 in text
+
+
+@pytest.mark.parametrize("count", [100, 500, 5000])
+def test_outline_stays_within_budget(count):
+    text, complete = build_source_material(make_slides(count), budget=1500)
+    assert not complete
+    assert estimate_tokens(text) <= 1500
+    assert text.startswith("1. Quarterly revenue")
+
+
+def test_cut_outline_points_to_get_slide_content():
+    text, _ = build_source_material(make_slides(500), budget=1500)
+    last = text.splitlines()[-1]
+    listed = len(text.splitlines()) - 1
+    assert last.startswith(f"…and {500 - listed} more slides")
+    assert "get_slide_content" in last
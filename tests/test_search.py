@@ -0,0 +1,31 @@
+import unicodedata
+
+from search import SlideIndex, tokenize
+
+
+def test_tokenize_keeps_accented_words_whole():
+    assert tokenize("café Résumé") == ["café", "résumé"]
+    # Decomposed input matches the composed form
+    assert tokenize(unicodedata.normalize("NFD", "café")) == ["café"]
+
+
+def test_tokenize_devanagari():
+    assert tokenize("नमस्ते दुनिया। हिन्दी भाषा") == ["नमस्ते", "दुनिया", "हिन्दी", "भाषा"]
+
+
+def test_tokenize_english_drops_stopwords():
+    assert tokenize("What is the Q3 revenue?") == ["q3", "revenue"]
+
+
+def test_search_finds_non_english_slides(tmp_path):
+    slides = [
+        {"slide_number": 1, "title": "परिचय", "bullets": ["हमारी कंपनी का इतिहास"]},
+        {"slide_number": 2, "title": "राजस्व", "bullets": ["पिछले साल का राजस्व बढ़ा"]},
+        {"slide_number": 3, "title": "Stratégie", "bullets": ["Marché européen"]},
+    ]
+    path = str(tmp_path / "search.npz")
+    SlideIndex.build(slides).save(path)
+    index = SlideIndex.load(path)
+
+    assert index.search("राजस्व कितना बढ़ा?")[0][0] == 2
+    assert index.search("marché")[0][0] == 3
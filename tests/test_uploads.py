@@ -0,0 +1,156 @@
+import io
+import os
+import hashlib
+import zipfile
+
+import pytest
+from pptx import Presentation
+
+from uploads import UploadError, UploadStore, check_header, check_package
+
+
+@pytest.fixture
+def pptx_bytes():
+    prs = Presentation()
+    prs.slides.add_slide(prs.slide_layouts[6])
+    out = io.BytesIO()
+    prs.save(out)
+    return out.getvalue()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(str(tmp_path / "uploads"))
+
+
+class DroppedStream:
+    """A request body whose client goes away after sending some bytes."""
+
+    def __init__(self, data):
+        self.data = data
+        self.sent = False
+
+    def read(self, size):
+        if self.sent:
+            raise OSError("client disconnected")
+        self.sent = True
+        return self.data
+
+
+def test_upload_in_chunks(store, pptx_bytes):
+    upload = store.create("deck.pptx", len(pptx_bytes))
+    half = len(pptx_bytes) // 2
+    store.append(upload.id, 0, io.BytesIO(pptx_bytes[:half]))
+    store.append(upload.id, half, io.BytesIO(pptx_bytes[half:]))
+    path, digest = store.complete(upload.id)
+    with open(path, "rb") as f:
+        assert f.read() == pptx_bytes
+    assert digest == hashlib.sha256(pptx_bytes).hexdigest()
+
+
+def test_offset_mismatch_reports_position(store, pptx_bytes):
+    upload = store.create("deck.pptx", len(pptx_bytes))
+    store.append(upload.id, 0, io.BytesIO(pptx_bytes[:1000]))
+    for offset in (0, 2000):
+        with pytest.raises(UploadError) as excinfo:
+            store.append(upload.id, offset, io.BytesIO(pptx_bytes[offset:offset + 1000]))
+        assert excinfo.value.status == 409
+        assert excinfo.value.details == {"received": 1000}
+    assert store.get(upload.id).received == 1000
+
+
+def test_resume_after_partial_append(store, pptx_bytes):
+    upload = store.create("deck.pptx", len(pptx_bytes))
+    store.append(upload.id, 0, io.BytesIO(pptx_bytes[:1000]))
+    with pytest.raises(OSError):
+        store.append(upload.id, 1000, DroppedStream(pptx_bytes[1000:3000]))
+    # The cut-off chunk is not counted, so the client resumes where it was
+    assert store.get(upload.id).received == 1000
+    store.append(upload.id, 1000, io.BytesIO(pptx_bytes[1000:]))
+    path, digest = store.complete(upload.id)
+    assert digest == hashlib.sha256(pptx_bytes).hexdigest()
+    with open(path, "rb") as f:
+        assert f.read() == pptx_bytes
+
+
+def test_complete_truncates_leftover_tail(store, pptx_bytes):
+    upload = store.create("deck.pptx", len(pptx_bytes))
+    store.append(upload.id, 0, io.BytesIO(pptx_bytes))
+    with open(upload.path, "ab") as f:
+        f.write(b"\0" * 4096)
+    path, _ = store.complete(upload.id)
+    assert os.path.getsize(path) == len(pptx_bytes)
+    check_package(path)
+
+
+def test_complete_before_all_bytes_arrive(store, pptx_bytes):
+    upload = store.create("deck.pptx", len(pptx_bytes) + 100)
+    store.append(upload.id, 0, io.BytesIO(pptx_bytes))
+    with pytest.raises(UploadError) as excinfo:
+        store.complete(upload.id)
+    assert excinfo.value.status == 409
+    assert excinfo.value.details == {"received": len(pptx_bytes)}
+    # The session stays open for the rest
+    assert store.get(upload.id).received == len(pptx_bytes)
+
+
+def test_chunk_past_declared_size(store, pptx_bytes):
+    upload = store.create("deck.pptx", len(pptx_bytes) - 100)
+    with pytest.raises(UploadError) as excinfo:
+        store.append(upload.id, 0, io.BytesIO(pptx_bytes))
+    assert excinfo.value.status == 413
+    assert not os.path.exists(upload.path)
+    with pytest.raises(UploadError) as excinfo:
+        store.get(upload.id)
+    assert excinfo.value.status == 404
+
+
+def test_create_rejects_bad_requests(store):
+    for filename, size, status in (("deck.ppt", 10, 400), ("deck.pptx", 0, 400),
+                                   ("deck.pptx", store.max_bytes + 1, 413)):
+        with pytest.raises(UploadError) as excinfo:
+            store.create(filename, size)
+        assert excinfo.value.status == status
+
+
+def test_first_chunk_must_be_a_pptx(store, pptx_bytes):
+    ole = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + b"\0" * 1024
+    upload = store.create("deck.pptx", len(ole))
+    with pytest.raises(UploadError) as excinfo:
+        store.append(upload.id, 0, io.BytesIO(ole))
+    assert excinfo.value.status == 415
+    assert not os.path.exists(upload.path)
+
+
+def test_check_header(pptx_bytes):
+    check_header(pptx_bytes[:512])
+
+    other_zip = io.BytesIO()
+    with zipfile.ZipFile(other_zip, "w") as package:
+        package.writestr("notes.txt", "hello")
+    rejected = [
+        b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + b"\0" * 504,  # legacy .ppt / encrypted
+        b"%PDF-1.7\n" + b"\0" * 503,
+        other_zip.getvalue()[:512],
+        b"PK\x03\x04",
+    ]
+    for head in rejected:
+        with pytest.raises(UploadError) as excinfo:
+            check_header(head)
+        assert excinfo.value.status == 415
+
+
+def test_check_package(tmp_path, pptx_bytes):
+    truncated = tmp_path / "truncated.pptx"
+    truncated.write_bytes(pptx_bytes[:len(pptx_bytes) // 2])
+    with pytest.raises(UploadError) as excinfo:
+        check_package(str(truncated))
+    assert excinfo.value.status == 422
+
+    docx = tmp_path / "document.pptx"
+    with zipfile.ZipFile(docx, "w") as package:
+        package.writestr("[Content_Types].xml", "<Types/>")
+        package.writestr("word/document.xml", "<document/>")
+    with pytest.raises(UploadError) as excinfo:
+        check_package(str(docx))
+    assert excinfo.value.status == 415
@@ -0,0 +1,210 @@
+"""Resumable, chunked .pptx uploads.
+
+    POST   /api/uploads                  {"filename", "size"} -> upload_id
+    PUT    /api/uploads/<id>?offset=N    raw chunk bytes, appended at N
+    GET    /api/uploads/<id>             bytes received so far (to resume)
+    POST   /api/uploads/<id>/complete    start conversion
+    DELETE /api/uploads/<id>             abandon
+
+Chunks are streamed straight into a temp file and through SHA-256 as they
+arrive, so nothing is buffered whole in memory and the file is never read
+again to hash it. The first bytes must look like an OOXML package (a ZIP
+whose first entry is a package part); legacy .ppt and password-protected
+files, which are OLE containers, are refused right there.
+"""
+import os
+import time
+import uuid
+import hashlib
+import logging
+import threading
+import zipfile
+
+logger = logging.getLogger('ppt-uploads')
+
+MAX_UPLOAD_MB = int(os.environ.get("MAX_UPLOAD_MB", 200))
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_MB", 8)) * 1024 * 1024
+# Unfinished uploads are dropped after this long without a chunk
+UPLOAD_SESSION_TTL = int(os.environ.get("UPLOAD_SESSION_TTL", 3600))
+
+_READ_BYTES = 64 * 1024
+_ZIP_MAGIC = b"PK\x03\x04"
+_OLE_MAGIC = b"\xd0\xcf\x11\xe0"
+# Writers differ in which part they store first, but it is always one of these
+_OOXML_FIRST_ENTRIES = ("[Content_Types].xml", "_rels/", "docProps/", "ppt/")
+_HEADER_BYTES = 30
+# The first chunk must carry at least this much (or the whole file)
+HEAD_BYTES = 512
+
+
+class UploadError(Exception):
+    """Rejected upload; status is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+def check_header(head):
+    """Raise UploadError unless head (the first bytes) starts a .pptx package."""
+    if head.startswith(_OLE_MAGIC):
+        raise UploadError("Legacy .ppt and password-protected files are not supported", 415)
+    if len(head) < _HEADER_BYTES or not head.startswith(_ZIP_MAGIC):
+        raise UploadError("Not a .pptx file", 415)
+    name_length = int.from_bytes(head[26:28], "little")
+    name = head[_HEADER_BYTES:_HEADER_BYTES + name_length].decode("utf-8", "replace")
+    if len(head) >= _HEADER_BYTES + name_length and not name.startswith(_OOXML_FIRST_ENTRIES):
+        raise UploadError("Not a .pptx file", 415)
+
+
+def check_package(path):
+    """Cheap full check once every byte is in: reads only the ZIP directory."""
+    try:
+        with zipfile.ZipFile(path) as package:
+            names = set(package.namelist())
+    except zipfile.BadZipFile:
+        raise UploadError("The file is corrupt or incomplete", 422)
+    if "ppt/presentation.xml" not in names:
+        raise UploadError("Not a PowerPoint presentation", 415)
+
+
+def validate_filename(filename):
+    if not filename:
+        raise UploadError("No selected file")
+    if not filename.lower().endswith(".pptx"):
+        raise UploadError("Invalid file type")
+
+
+def copy_stream(stream, out, hasher, limit, validate_head=False):
+    """Copy stream into out while hashing, at most limit bytes; returns bytes written.
+
+    With validate_head the package header is checked before anything past
+    the first HEAD_BYTES is written.
+    """
+    written = 0
+    head = b""
+    while True:
+        data = stream.read(_READ_BYTES)
+        if not data:
+            break
+        if written + len(data) > limit:
+            raise UploadError("Upload exceeds the allowed size", 413)
+        if validate_head and len(head) < HEAD_BYTES:
+            head += data
+            if len(head) >= HEAD_BYTES:
+                check_header(head)
+        out.write(data)
+        hasher.update(data)
+        written += len(data)
+    if validate_head and len(head) < HEAD_BYTES:
+        check_header(head)
+    return written
+
+
+class UploadSession:
+    def __init__(self, folder, filename, size):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.size = size
+        self.received = 0
+        self.path = os.path.join(folder, f"{self.id}.part")
+        self.hasher = hashlib.sha256()
+        self.touched = time.time()
+        self.lock = threading.Lock()
+
+    def to_dict(self):
+        return {"upload_id": self.id, "filename": self.filename,
+                "size": self.size, "received": self.received}
+
+
+class UploadStore:
+    """Open upload sessions; chunks for one session are applied one at a time."""
+
+    def __init__(self, folder, max_bytes=MAX_UPLOAD_BYTES, ttl=UPLOAD_SESSION_TTL):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def create(self, filename, size):
+        validate_filename(filename)
+        if not isinstance(size, int) or size <= 0:
+            raise UploadError("size must be a positive number of bytes")
+        if size > self.max_bytes:
+            raise UploadError(f"File is larger than {MAX_UPLOAD_MB} MB", 413)
+        self._prune()
+        upload = UploadSession(self.folder, filename, size)
+        open(upload.path, "wb").close()
+        with self._lock:
+            self._sessions[upload.id] = upload
+        return upload
+
+    def get(self, upload_id):
+        with self._lock:
+            upload = self._sessions.get(upload_id)
+        if upload is None:
+            raise UploadError("Unknown or expired upload", 404)
+        return upload
+
+    def append(self, upload_id, offset, stream):
+        """Write the chunk at offset; a repeated or skipped offset gets a 409 with
+        the current position so the client can resume from there. A chunk cut
+        off halfway is simply not counted and can be sent again."""
+        upload = self.get(upload_id)
+        if not upload.lock.acquire(blocking=False):
+            raise UploadError("Another chunk for this upload is in progress", 409,
+                              received=upload.received)
+        try:
+            if offset != upload.received:
+                raise UploadError("Chunk does not continue the upload", 409, received=upload.received)
+            # Hash into a copy: an interrupted chunk must leave the session as it was
+            hasher = upload.hasher.copy()
+            with open(upload.path, "r+b") as out:
+                out.seek(offset)
+                try:
+                    written = copy_stream(stream, out, hasher, upload.size - offset,
+                                          validate_head=offset == 0)
+                except UploadError:
+                    self.discard(upload_id)
+                    raise
+            upload.hasher = hasher
+            upload.received += written
+            upload.touched = time.time()
+            return upload
+        finally:
+            upload.lock.release()
+
+    def complete(self, upload_id):
+        """Close the session; returns (path, sha256 hex) of the finished file."""
+        upload = self.get(upload_id)
+        with upload.lock:
+            if upload.received != upload.size:
+                raise UploadError("Upload is incomplete", 409, received=upload.received)
+            with self._lock:
+                self._sessions.pop(upload_id, None)
+        try:
+            # Drop any tail left by an interrupted chunk
+            os.truncate(upload.path, upload.size)
+            check_package(upload.path)
+        except UploadError:
+            os.remove(upload.path)
+            raise
+        return upload.path, upload.hasher.hexdigest()
+
+    def discard(self, upload_id):
+        with self._lock:
+            upload = self._sessions.pop(upload_id, None)
+        if upload and os.path.exists(upload.path):
+            os.remove(upload.path)
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [upload_id for upload_id, upload in self._sessions.items() if upload.touched < cutoff]
+        for upload_id in expired:
+            logger.info(f"🧹 Dropping stale upload {upload_id}")
+            self.discard(upload_id)